@@ -0,0 +1,787 @@
+"""Offline end-to-end benchmark.
+
+Boots BookShelf against a local stand-in for Discord's REST API and feeds
+gateway events straight into its connection state, so real cogs handle real
+command invocations without touching the network. Latency per command comes
+from the bot's own metrics, throughput from the harness.
+
+    python benchmark.py --guilds 10 --users 500 --rate 200 --duration 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import discord
+from aiohttp import web
+from discord.ext import commands
+
+import bot as bookshelf
+from cogs.customcommands.arguments import Argument
+from cogs.customcommands.context import MiniContext
+from metrics import Histogram
+
+
+Payload = dict[str, Any]
+
+
+SCENARIOS: dict[str, int] = {
+    'read': 15,
+    'app_read': 10,
+    'vote': 20,
+    'userinfo': 10,
+    'app_userinfo': 10,
+    'serverinfo': 5,
+    'roleinfo': 5,
+    'role_select': 10,
+    'custom_command': 15
+}
+
+EXTENSIONS = [
+    'cogs.share',
+    'cogs.democracy',
+    'cogs.info',
+    'cogs.roles',
+    'cogs.customcommands',
+    'cogs.private.errors'
+]
+
+
+_ids = itertools.count()
+
+
+def json_response(data: Any, *, status: int = 200) -> web.Response:
+    # discord.py only decodes bodies whose content type is exactly application/json
+    return web.Response(body=json.dumps(data).encode(), status=status, content_type='application/json')
+
+
+def snowflake() -> int:
+    return discord.utils.time_snowflake(discord.utils.utcnow()) + next(_ids) % (1 << 22)
+
+
+def timestamp() -> str:
+    return discord.utils.utcnow().isoformat()
+
+
+def user_payload(user_id: int, name: str, *, bot: bool = False) -> Payload:
+    return {
+        'id': str(user_id),
+        'username': name,
+        'discriminator': '0',
+        'global_name': None,
+        'avatar': None,
+        'bot': bot
+    }
+
+
+def member_payload(user: Payload, roles: list[str] = ()) -> Payload:
+    return {
+        'user': user,
+        'roles': list(roles),
+        'joined_at': timestamp(),
+        'deaf': False,
+        'mute': False,
+        'flags': 0,
+        'nick': None,
+        'avatar': None,
+        'pending': False,
+        'permissions': '8'
+    }
+
+
+class FakeGuild:
+    def __init__(self, index: int, users: list[Payload], bot_user: Payload, channels: int):
+        self.id = snowflake()
+        self.name = f'Guild {index}'
+        self.users = users
+        self.owner = users[0]
+        self.channel_ids = [snowflake() for _ in range(channels)]
+        self.role_ids = [snowflake() for _ in range(5)]
+        self.members = [member_payload(user) for user in users] + [member_payload(bot_user)]
+
+    def payload(self) -> Payload:
+        roles = [{
+            'id': str(self.id),
+            'name': '@everyone',
+            # everyone is an admin so election commands pass their checks
+            'permissions': '8',
+            'position': 0,
+            'color': 0,
+            'hoist': False,
+            'managed': False,
+            'mentionable': False,
+            'flags': 0
+        }]
+        roles += [{
+            'id': str(role_id),
+            'name': f'role {position}',
+            'permissions': '0',
+            'position': position,
+            'color': 0,
+            'hoist': False,
+            'managed': False,
+            'mentionable': True,
+            'flags': 0
+        } for position, role_id in enumerate(self.role_ids, 1)]
+
+        channels = [{
+            'id': str(channel_id),
+            'type': 0,
+            'guild_id': str(self.id),
+            'name': f'channel-{position}',
+            'position': position,
+            'permission_overwrites': [],
+            'nsfw': False,
+            'parent_id': None,
+            'topic': None,
+            'last_message_id': None,
+            'rate_limit_per_user': 0
+        } for position, channel_id in enumerate(self.channel_ids)]
+
+        return {
+            'id': str(self.id),
+            'name': self.name,
+            'icon': None,
+            'owner_id': self.owner['id'],
+            'afk_timeout': 300,
+            'verification_level': 0,
+            'default_message_notifications': 0,
+            'explicit_content_filter': 0,
+            'roles': roles,
+            'emojis': [],
+            'stickers': [],
+            'features': [],
+            'mfa_level': 0,
+            'nsfw_level': 0,
+            'premium_tier': 0,
+            'preferred_locale': 'en-US',
+            'system_channel_id': None,
+            'member_count': len(self.members),
+            'members': self.members,
+            'channels': channels,
+            'threads': [],
+            'voice_states': [],
+            'presences': [],
+            'stage_instances': [],
+            'guild_scheduled_events': [],
+            'large': False,
+            'unavailable': False
+        }
+
+
+class FakeDiscord:
+    """Answers the REST routes the benchmarked cogs use, like Discord would."""
+
+    def __init__(self, harness: Harness, latency: float):
+        self.harness = harness
+        self.latency = latency
+        self.requests = 0
+        self.unknown: dict[str, int] = {}
+        self.runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application(client_max_size=16 * 1024 * 1024)
+        self.app.router.add_route('*', '/api/v10/{path:.*}', self.handle)
+
+    async def start(self) -> int:
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        return site._server.sockets[0].getsockname()[1]  # type: ignore
+
+    async def close(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        parts = request.match_info['path'].strip('/').split('/')
+        body: Payload = {}
+        if request.can_read_body:
+            if request.content_type == 'application/json':
+                body = await request.json()
+            else:
+                await request.read()
+
+        harness = self.harness
+        method = request.method
+
+        if parts == ['users', '@me']:
+            return json_response(harness.bot_user)
+
+        if parts == ['oauth2', 'applications', '@me']:
+            return json_response({
+                'id': str(harness.application_id),
+                'name': harness.bot_user['username'],
+                'icon': None,
+                'description': '',
+                'bot_public': True,
+                'bot_require_code_grant': False,
+                'owner': harness.guilds[0].owner,
+                'verify_key': '',
+                'flags': 0
+            })
+
+        if parts[0] == 'channels' and len(parts) >= 3 and parts[2] == 'typing':
+            return web.Response(status=204)
+
+        if parts[0] == 'channels' and len(parts) == 3 and parts[2] == 'messages' and method == 'POST':
+            return json_response(harness.on_message_sent(int(parts[1]), body))
+
+        if parts[0] == 'channels' and len(parts) == 4 and parts[2] == 'messages' and method == 'PATCH':
+            return json_response(harness.on_message_sent(int(parts[1]), body, message_id=int(parts[3])))
+
+        if parts[0] == 'interactions' and parts[-1] == 'callback':
+            return json_response(harness.on_interaction_callback(int(parts[1]), parts[2], body))
+
+        if parts[0] == 'webhooks' and len(parts) >= 3:
+            token = parts[2]
+            message_id = parts[4] if len(parts) >= 5 else None
+            return json_response(harness.on_webhook(token, body, message_id, method))
+
+        if parts[0] == 'guilds' and len(parts) == 6 and parts[4] == 'roles':
+            return web.Response(status=204)
+
+        if parts[0] == 'users' and len(parts) == 2:
+            user = harness.users_by_id.get(int(parts[1]))
+            if user is not None:
+                return json_response(user)
+
+        key = f'{method} /{"/".join(parts)}'
+        self.unknown[key] = self.unknown.get(key, 0) + 1
+        return json_response({'message': 'Unknown', 'code': 0}, status=404)
+
+
+class Harness:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.fake = FakeDiscord(self, args.rest_latency)
+
+        self.bot_user = user_payload(snowflake(), 'BookShelf', bot=True)
+        self.application_id = int(self.bot_user['id'])
+        users = [user_payload(snowflake(), f'user{index}') for index in range(args.users)]
+        self.users_by_id = {int(user['id']): user for user in users}
+        self.guilds = [
+            FakeGuild(index, users[index::args.guilds], self.bot_user, args.channels)
+            for index in range(args.guilds)
+        ]
+        self.channel_guilds = {channel_id: guild for guild in self.guilds for channel_id in guild.channel_ids}
+
+        self.bot: bookshelf.BookShelf = discord.utils.MISSING
+        self.authors: dict[int, list[int]] = {}
+        self.role_menus: dict[int, int] = {}
+        self.custom_commands: dict[int, str] = {}
+
+        # interactive commands hold their channel so a select menu can be answered by whoever invoked it
+        self.channel_locks = {channel_id: asyncio.Lock() for channel_id in self.channel_guilds}
+        self.channel_users: dict[int, Payload] = {}
+        self.interaction_channels: dict[str, int] = {}
+
+        self.waiters: dict[Any, asyncio.Future[Optional[BaseException]]] = {}
+        self.component_latency = Histogram()
+        self.completed = 0
+        self.timed_out = 0
+
+    # rest callbacks
+
+    def message_payload(self, channel_id: int, body: Payload, message_id: Optional[int] = None) -> Payload:
+        guild = self.channel_guilds.get(channel_id)
+        payload = {
+            'id': str(message_id or snowflake()),
+            'channel_id': str(channel_id),
+            'author': self.bot_user,
+            'content': body.get('content') or '',
+            'embeds': body.get('embeds') or [],
+            'components': body.get('components') or [],
+            'attachments': [],
+            'mentions': [],
+            'mention_roles': [],
+            'mention_everyone': False,
+            'pinned': False,
+            'tts': False,
+            'timestamp': timestamp(),
+            'edited_timestamp': None,
+            'type': 0,
+            'flags': body.get('flags') or 0
+        }
+        if guild is not None:
+            payload['guild_id'] = str(guild.id)
+        return payload
+
+    def on_message_sent(self, channel_id: int, body: Payload, *, message_id: Optional[int] = None) -> Payload:
+        payload = self.message_payload(channel_id, body, message_id)
+        self.answer_select(channel_id, payload)
+        return payload
+
+    def on_interaction_callback(self, interaction_id: int, token: str, body: Payload) -> Payload:
+        channel_id = self.interaction_channels.get(token, 0)
+        message = self.message_payload(channel_id, body.get('data') or {})
+
+        # 4 sends a message, 7 edits the component's message
+        if body.get('type') in (4, 7):
+            self.answer_select(channel_id, message)
+
+        return {
+            'interaction': {
+                'id': str(interaction_id),
+                'type': 2,
+                'response_message_id': message['id'],
+                'response_message_loading': body.get('type') == 5,
+                'response_message_ephemeral': False
+            },
+            'resource': {'type': body.get('type', 4), 'message': message}
+        }
+
+    def on_webhook(self, token: str, body: Payload, message_id: Optional[str], method: str) -> Payload:
+        channel_id = self.interaction_channels.get(token, 0)
+        if method == 'POST':
+            self.resolve(('followup', token))
+
+        payload = self.message_payload(channel_id, body, None if message_id in (None, '@original') else int(message_id))
+        self.answer_select(channel_id, payload)
+        return payload
+
+    def answer_select(self, channel_id: int, message: Payload) -> None:
+        user = self.channel_users.get(channel_id)
+        if user is None:
+            return
+
+        for row in message['components']:
+            for component in row.get('components', ()):
+                if component.get('type') == 3 and not component.get('disabled') and component.get('options'):
+                    choice = component['options'][0]['value']
+                    asyncio.get_running_loop().call_later(
+                        self.args.think_time,
+                        self.click, channel_id, user, message, component['custom_id'], [choice]
+                    )
+                    return
+
+    # gateway
+
+    def member(self, user: Payload) -> Payload:
+        return {key: value for key, value in member_payload(user).items() if key != 'user'}
+
+    def send_message(self, message_id: int, channel_id: int, user: Payload, content: str) -> None:
+        guild = self.channel_guilds[channel_id]
+        self.bot._connection.parsers['MESSAGE_CREATE']({
+            'id': str(message_id),
+            'channel_id': str(channel_id),
+            'guild_id': str(guild.id),
+            'author': user,
+            'member': self.member(user),
+            'content': content,
+            'embeds': [],
+            'components': [],
+            'attachments': [],
+            'mentions': [],
+            'mention_roles': [],
+            'mention_everyone': False,
+            'pinned': False,
+            'tts': False,
+            'timestamp': timestamp(),
+            'edited_timestamp': None,
+            'type': 0,
+            'flags': 0
+        })
+
+    def send_interaction(self, interaction_id: int, channel_id: int, user: Payload, interaction_type: int,
+                         data: Payload, message: Optional[Payload] = None) -> str:
+        token = f'token-{interaction_id}'
+        guild = self.channel_guilds[channel_id]
+        self.interaction_channels[token] = channel_id
+
+        payload = {
+            'id': str(interaction_id),
+            'application_id': str(self.application_id),
+            'type': interaction_type,
+            'token': token,
+            'version': 1,
+            'guild_id': str(guild.id),
+            'channel_id': str(channel_id),
+            'channel': {'id': str(channel_id), 'type': 0, 'guild_id': str(guild.id)},
+            'member': member_payload(user),
+            'data': data,
+            'locale': 'en-US',
+            'guild_locale': 'en-US',
+            'app_permissions': '8',
+            'attachment_size_limit': 8 * 1024 * 1024,
+            'entitlements': [],
+            'authorizing_integration_owners': {'0': str(guild.id)},
+            'context': 0
+        }
+        if message is not None:
+            payload['message'] = message
+
+        self.bot._connection.parsers['INTERACTION_CREATE'](payload)
+        return token
+
+    def click(self, channel_id: int, user: Payload, message: Payload, custom_id: str, values: list[str]) -> str:
+        return self.send_interaction(snowflake(), channel_id, user, 3, {
+            'custom_id': custom_id,
+            'component_type': 3,
+            'values': values
+        }, message)
+
+    # completion tracking
+
+    def resolve(self, key: Any, error: Optional[BaseException] = None) -> None:
+        future = self.waiters.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(error)
+
+    async def wait_for(self, key: Any) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[key] = future
+        try:
+            await asyncio.wait_for(future, timeout=self.args.timeout)
+        except asyncio.TimeoutError:
+            self.waiters.pop(key, None)
+            self.timed_out += 1
+        else:
+            self.completed += 1
+
+    def install_listeners(self) -> None:
+        bot = self.bot
+
+        async def on_command_completion(ctx: commands.Context) -> None:
+            self.resolve(ctx.message.id)
+
+        async def on_command_error(ctx: commands.Context, error: commands.CommandError) -> None:
+            self.resolve(ctx.message.id, error)
+
+        async def on_app_command_completion(interaction: discord.Interaction, command: Any) -> None:
+            self.resolve(interaction.id)
+
+        bot.add_listener(on_command_completion)
+        bot.add_listener(on_command_error)
+        bot.add_listener(on_app_command_completion)
+
+        on_error = bot.tree.on_error
+
+        async def on_tree_error(interaction: discord.Interaction, error: Exception) -> None:
+            self.resolve(interaction.id, error)
+            await on_error(interaction, error)
+
+        bot.tree.on_error = on_tree_error  # type: ignore
+
+    # scenarios
+
+    def pick(self) -> tuple[FakeGuild, int, Payload]:
+        guild = self.random.choice(self.guilds)
+        return guild, self.random.choice(guild.channel_ids), self.random.choice(guild.users)
+
+    async def prefix(self, channel_id: int, user: Payload, content: str) -> None:
+        message_id = snowflake()
+        # waiting before the message is parsed, a command can finish without ever yielding
+        waiter = asyncio.ensure_future(self.wait_for(message_id))
+        await asyncio.sleep(0)
+        self.send_message(message_id, channel_id, user, content)
+        await waiter
+
+    async def app(self, channel_id: int, user: Payload, name: str, options: list[Payload],
+                  resolved_users: list[Payload] = ()) -> None:
+        data = {'id': str(snowflake()), 'name': name, 'type': 1, 'options': options}
+        if resolved_users:
+            data['resolved'] = {
+                'users': {target['id']: target for target in resolved_users},
+                'members': {target['id']: self.member(target) for target in resolved_users}
+            }
+
+        interaction_id = snowflake()
+        waiter = asyncio.ensure_future(self.wait_for(interaction_id))
+        await asyncio.sleep(0)
+        self.send_interaction(interaction_id, channel_id, user, 2, data)
+        await waiter
+
+    async def interactive(self, channel_id: int, user: Payload, run: Callable[[], Awaitable[None]]) -> None:
+        async with self.channel_locks[channel_id]:
+            self.channel_users[channel_id] = user
+            try:
+                await run()
+            finally:
+                del self.channel_users[channel_id]
+
+    async def run_scenario(self, name: str) -> None:
+        guild, channel_id, user = self.pick()
+
+        if name == 'read':
+            author = self.random.choice(self.authors[guild.id])
+            await self.interactive(channel_id, user, lambda: self.prefix(channel_id, user, f'bk read <@{author}>'))
+        elif name == 'app_read':
+            author = self.users_by_id[self.random.choice(self.authors[guild.id])]
+            await self.interactive(channel_id, user, lambda: self.app(
+                channel_id, user, 'read', [{'name': 'author', 'type': 6, 'value': author['id']}], [author]
+            ))
+        elif name == 'vote':
+            candidate = self.random.choice(guild.users[:5])
+            await self.prefix(channel_id, user, f'bk election vote <@{candidate["id"]}>')
+        elif name == 'userinfo':
+            target = self.random.choice(guild.users)
+            await self.prefix(channel_id, user, f'bk userinfo <@{target["id"]}>')
+        elif name == 'app_userinfo':
+            target = self.random.choice(guild.users)
+            await self.app(channel_id, user, 'userinfo', [{'name': 'user', 'type': 6, 'value': target['id']}], [target])
+        elif name == 'serverinfo':
+            await self.prefix(channel_id, user, 'bk serverinfo')
+        elif name == 'roleinfo':
+            await self.prefix(channel_id, user, f'bk roleinfo {self.random.choice(guild.role_ids)}')
+        elif name == 'role_select':
+            await self.select_roles(guild, channel_id, user)
+        elif name == 'custom_command':
+            target = self.random.choice(guild.users)
+            await self.prefix(channel_id, user, f'bk {self.custom_commands[guild.id]} <@{target["id"]}>')
+
+    async def select_roles(self, guild: FakeGuild, channel_id: int, user: Payload) -> None:
+        message_id = self.role_menus[guild.id]
+        message = self.message_payload(channel_id, {
+            'components': [{'type': 1, 'components': [{
+                'type': 3,
+                'custom_id': 'RoleSelect',
+                'options': [{'label': f'role {role_id}', 'value': str(role_id)} for role_id in guild.role_ids],
+                'min_values': 0,
+                'max_values': len(guild.role_ids)
+            }]}]
+        }, message_id)
+        values = self.random.sample([str(role_id) for role_id in guild.role_ids], 2)
+
+        start = time.perf_counter()
+        interaction_id = snowflake()
+        # the select's response is deferred, the role edits finish with a followup
+        waiter = asyncio.ensure_future(self.wait_for(('followup', f'token-{interaction_id}')))
+        await asyncio.sleep(0)
+        self.send_interaction(interaction_id, channel_id, user, 3, {
+            'custom_id': 'RoleSelect',
+            'component_type': 3,
+            'values': values
+        }, message)
+        await waiter
+        self.component_latency.observe(time.perf_counter() - start)
+
+    # setup
+
+    async def seed(self) -> None:
+        bot = self.bot
+        share = bot.get_cog('Share')
+        roles = bot.get_cog('Roles')
+        custom = bot.get_cog('CustomCommands')
+
+        for index, guild in enumerate(self.guilds):
+            authors = [int(user['id']) for user in guild.users[:max(len(guild.users) // 10, 1)]]
+            self.authors[guild.id] = authors
+            for author in authors:
+                for number in range(3):
+                    text = ' '.join(self.random.choices(('lorem', 'ipsum', 'dolor', 'sit', 'amet'), k=200))
+                    await share.process_write(discord.Object(id=author), f'story {number}', text)
+
+            message_id = snowflake()
+            self.role_menus[guild.id] = message_id
+            await roles.insert(
+                [str(role_id) for role_id in guild.role_ids],
+                [None] * len(guild.role_ids),
+                [None] * len(guild.role_ids),
+                discord.Object(id=int(guild.owner['id'])),
+                discord.Object(id=message_id)
+            )
+            roles.messages.append(message_id)
+
+            name = f'greet{index}'
+            self.custom_commands[guild.id] = name
+            ctx = MiniContext.from_dict({'guild_id': str(guild.id), 'author': guild.owner['username']})
+            bot.add_command(custom.create_command(
+                name=name,
+                args=[Argument('user', commands.MemberConverter, None)],
+                output='Hello {user.name}!',
+                ctx=ctx
+            ))
+
+            await self.prefix(guild.channel_ids[0], guild.owner, f'bk election create 1 <#{guild.channel_ids[0]}>')
+
+    async def connect(self) -> None:
+        state = self.bot._connection
+        state.parsers['READY']({
+            'v': 10,
+            'user': self.bot_user,
+            'guilds': [{'id': str(guild.id), 'unavailable': True} for guild in self.guilds],
+            'session_id': 'benchmark',
+            'resume_gateway_url': 'ws://127.0.0.1',
+            'application': {'id': str(self.application_id), 'flags': 0}
+        })
+        for guild in self.guilds:
+            state.parsers['GUILD_CREATE'](guild.payload())
+
+        await self.bot.wait_until_ready()
+
+    async def run(self) -> Payload:
+        port = await self.fake.start()
+        base = f'http://127.0.0.1:{port}/api/v10'
+        discord.http.Route.BASE = base
+
+        bot = bookshelf.BookShelf(
+            metrics_path='./metrics.prom',
+            chunk_guilds_at_startup=False,
+            guild_ready_timeout=0.1
+        )
+        bot.initial_extensions = EXTENSIONS
+        bot.owner_id = int(self.guilds[0].owner['id'])
+        self.bot = bot
+
+        try:
+            await bot.login('benchmark')
+            self.install_listeners()
+            await self.connect()
+            await self.seed()
+
+            # setup commands shouldn't count towards the results
+            bot.metrics.commands.clear()
+            self.completed = 0
+
+            names = list(SCENARIOS)
+            weights = list(SCENARIOS.values())
+            interval = 1 / self.args.rate
+            tasks: list[asyncio.Task[None]] = []
+
+            start = time.perf_counter()
+            next_at = start
+            while time.perf_counter() - start < self.args.duration:
+                scenario = self.random.choices(names, weights)[0]
+                tasks.append(asyncio.create_task(self.run_scenario(scenario)))
+
+                next_at += interval
+                await asyncio.sleep(max(next_at - time.perf_counter(), 0))
+
+            await asyncio.gather(*tasks)
+            report = self.report(time.perf_counter() - start, len(tasks))
+
+            for guild in self.guilds:
+                await self.prefix(guild.channel_ids[0], guild.owner, 'bk election finish')
+            return report
+        finally:
+            await bot.close()
+            await self.fake.close()
+
+    def report(self, elapsed: float, fired: int) -> Payload:
+        commands_ = []
+        for metric in sorted(self.bot.metrics.commands.values(), key=lambda m: m.invocations, reverse=True):
+            commands_.append({
+                'command': metric.name,
+                'type': metric.kind,
+                'count': metric.invocations,
+                'errors': metric.errors,
+                'p50': metric.latency.percentile(0.5),
+                'p95': metric.latency.percentile(0.95),
+                'p99': metric.latency.percentile(0.99)
+            })
+        if self.component_latency.count:
+            commands_.append({
+                'command': 'RoleSelect',
+                'type': 'component',
+                'count': self.component_latency.count,
+                'errors': 0,
+                'p50': self.component_latency.percentile(0.5),
+                'p95': self.component_latency.percentile(0.95),
+                'p99': self.component_latency.percentile(0.99)
+            })
+
+        return {
+            'guilds': len(self.guilds),
+            'users': len(self.users_by_id),
+            'fired': fired,
+            'completed': self.completed,
+            'timed_out': self.timed_out,
+            'elapsed': elapsed,
+            'throughput': self.completed / elapsed,
+            'rest_requests': self.fake.requests,
+            'unknown_routes': self.fake.unknown,
+            'commands': commands_
+        }
+
+
+def prepare_directory(directory: str) -> None:
+    # cogs keep their state relative to the working directory, so the run gets its own copy
+    for cog in ('share', 'democracy', 'info', 'roles', 'customcommands'):
+        os.makedirs(os.path.join(directory, 'cogs', cog), exist_ok=True)
+
+    for path, content in (
+            ('cogs/customcommands/command_storage.json', '[]'),
+            ('cogs/roles/messages.json', '[]')
+    ):
+        with open(os.path.join(directory, path), 'w') as file:
+            file.write(content)
+
+
+def print_report(report: Payload) -> None:
+    print(f'{report["guilds"]} guilds, {report["users"]} users')
+    print(f'{report["completed"]}/{report["fired"]} invocations completed in {report["elapsed"]:.2f}s '
+          f'({report["throughput"]:.1f}/s), {report["timed_out"]} timed out, {report["rest_requests"]} REST requests')
+    print()
+
+    rows = [('command', 'type', 'count', 'errors', 'p50', 'p95', 'p99')]
+    for command in report['commands']:
+        rows.append((
+            command['command'],
+            command['type'],
+            str(command['count']),
+            str(command['errors']),
+            *(f'{command[q] * 1000:.1f}ms' for q in ('p50', 'p95', 'p99'))
+        ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+    if report['unknown_routes']:
+        print()
+        print('Unhandled routes:', ', '.join(f'{route} x{count}' for route, count in report['unknown_routes'].items()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Offline end-to-end command benchmark.')
+    parser.add_argument('--guilds', type=int, default=10)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--channels', type=int, default=5, help='text channels per guild')
+    parser.add_argument('--rate', type=float, default=100, help='invocations per second')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to fire invocations for')
+    parser.add_argument('--rest-latency', type=float, default=0, help='seconds added to every REST response')
+    parser.add_argument('--think-time', type=float, default=0.01, help='seconds before a select menu is answered')
+    parser.add_argument('--timeout', type=float, default=30, help='seconds to wait for an invocation')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--keep', action='store_true', help='keep the working directory')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    directory = tempfile.mkdtemp(prefix='bookshelf-benchmark-')
+    prepare_directory(directory)
+    cwd = os.getcwd()
+    os.chdir(directory)
+
+    try:
+        report = asyncio.run(Harness(args).run())
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=4)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
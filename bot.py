@@ -1,11 +1,36 @@
 import asyncio
+import dataclasses
+import gzip
+import itertools
 import logging
-from typing import Any, Callable, Coroutine, Optional, TypeVar
+import logging.handlers
+import os
+import queue
+import shutil
+import signal
+import time
+import types
+from typing import Any, Callable, ClassVar, Coroutine, Hashable, Iterable, Optional, TypeVar, Union
 
 import aiohttp
 import discord
+from discord import app_commands
 from discord.ext import commands
 
+from checkpoint import Checkpoints, cluster_path
+from extensions import AppCommandStub, BookShelfTree, ExtensionManifest, ExtensionTiming, is_submodule, make_command_stub
+from httpcache import HTTPCache
+from loopmonitor import LoopLagMonitor
+from metrics import Metrics
+from outbound import Outbound
+from storage import Storage
+from utils import ManagedView, SingleFlight
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 
 T = TypeVar('T')
 
@@ -13,27 +38,129 @@ T = TypeVar('T')
 MISSING = discord.utils.MISSING
 
 
-def setup_logging(formatter: logging.Formatter):
-    discord_logger = logging.getLogger('discord')
-    discord_logger.setLevel(logging.DEBUG)
-    handler = logging.FileHandler(filename='logs/discord.log', encoding='utf-8', mode='w')
-    handler.setFormatter(formatter)
-    discord_logger.addHandler(handler)
+_log = logging.getLogger(__name__)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps every record above DEBUG but only one in ``rate`` DEBUG records."""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = rate
+        self.counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or next(self.counter) % self.rate == 0
+
+
+def gzip_namer(name: str) -> str:
+    return f'{name}.gz'
+
+
+def gzip_rotator(source: str, dest: str) -> None:
+    with open(source, 'rb') as file, gzip.open(dest, 'wb') as compressed:
+        shutil.copyfileobj(file, compressed)
+    os.remove(source)
+
+
+def make_file_handler(
+        filename: str,
+        *,
+        max_bytes: int,
+        when: Optional[str],
+        backup_count: int,
+        compress: bool
+) -> logging.Handler:
+    handler: logging.handlers.BaseRotatingHandler
+    if when is not None:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            filename, when=when, backupCount=backup_count, encoding='utf-8'
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+
+    if compress:
+        handler.namer = gzip_namer
+        handler.rotator = gzip_rotator
+    return handler
+
+
+def setup_logging(
+        formatter: logging.Formatter,
+        level: int = logging.INFO,
+        *,
+        directory: str = 'logs',
+        max_bytes: int = 8 * 1024 * 1024,
+        when: Optional[str] = None,
+        backup_count: int = 5,
+        compress: bool = True,
+        debug_sample_rate: int = 1
+) -> logging.handlers.QueueListener:
+    # the loop thread only puts records on a queue, formatting and disk writes happen on the listener's thread
+    os.makedirs(directory, exist_ok=True)
 
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    discord_logger.addHandler(console_handler)
+    handlers: list[logging.Handler] = [console_handler]
+
+    for name in ('discord', 'asyncio'):
+        logging.getLogger(name).setLevel(level)
+
+        handler = make_file_handler(
+            os.path.join(directory, f'{name}.log'),
+            max_bytes=max_bytes,
+            when=when,
+            backup_count=backup_count,
+            compress=compress
+        )
+        handler.addFilter(logging.Filter(name))
+        handlers.append(handler)
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    if debug_sample_rate > 1:
+        queue_handler.addFilter(SamplingFilter(debug_sample_rate))
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+@dataclasses.dataclass(frozen=True)
+class FailedFetch:
+    # only what's needed to raise the error again, the exception itself would keep its traceback's frames alive
+    type: type[discord.HTTPException]
+    status: int
+    reason: str
+    code: int
+    text: str
 
-    asyncio_logger = logging.getLogger('asyncio')
-    asyncio_logger.setLevel(logging.DEBUG)
-    handler = logging.FileHandler(filename='logs/asyncio.log', encoding='utf-8', mode='w')
-    handler.setFormatter(formatter)
-    asyncio_logger.addHandler(handler)
+    @classmethod
+    def from_exception(cls, error: discord.HTTPException) -> 'FailedFetch':
+        return cls(type(error), error.status, getattr(error.response, 'reason', ''), error.code, error.text)
+
+    def to_exception(self) -> discord.HTTPException:
+        response = types.SimpleNamespace(status=self.status, reason=self.reason)
+        return self.type(response, {'code': self.code, 'message': self.text})  # type: ignore
 
 
 class BookShelf(commands.Bot):
     logging_formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s')
+    log_directory = 'logs'
+    log_max_bytes = 8 * 1024 * 1024
+    log_rotate_when: Optional[str] = None  # e.g. 'midnight' to rotate by time instead of size
+    log_backup_count = 5
+    log_compress = True
+    log_debug_sample_rate = 1
 
     initial_extensions = [
         'cogs.share',
@@ -53,15 +180,94 @@ class BookShelf(commands.Bot):
         'cogs.logs'
     ]
 
+    # command-only extensions with heavy imports, only loaded once one of their commands is used
+    lazy_extensions: ClassVar[frozenset[str]] = frozenset({
+        'cogs.share',
+        'cogs.dbooks',
+        'cogs.python',
+        'cogs.info',
+        'cogs.advice',
+        'cogs.foaas',
+        'cogs.timestamps',
+        'cogs.text'
+    })
+
+    # extension -> extensions that have to finish loading before it starts
+    extension_dependencies: ClassVar[dict[str, tuple[str, ...]]] = {
+        'cogs.private': ('cogs.customcommands',)
+    }
+
+    manifest_path: ClassVar[str] = './extension_manifest.json'
+
+    # how long a NotFound/Forbidden from get_or_fetch is remembered
+    negative_cache_ttl: ClassVar[float] = 60
+    negative_cache_size: ClassVar[int] = 4096
+
+    # same default as asyncio's debug mode
+    slow_callback_duration: ClassVar[float] = 0.1
+
+    # views without a timeout past this are timed out least recently used first
+    max_live_views: ClassVar[int] = 1000
+
+    checkpoint_interval: ClassVar[float] = 60
+    # how long closing, on SIGTERM or otherwise, waits for state to be saved before giving up
+    shutdown_deadline: ClassVar[float] = 10
+
     test_guild = discord.Object(id=878431847162466354)
 
-    def __init__(self, nasa_api_key: Optional[str] = None):
+    def __init__(
+            self,
+            nasa_api_key: Optional[str] = None,
+            http_cache_dir: Optional[str] = None,
+            lazy: bool = False,
+            metrics_path: Optional[str] = './metrics.prom',
+            lean: bool = False,
+            member_cache_flags: Optional[discord.MemberCacheFlags] = None,
+            cluster_id: Optional[int] = None,
+            **options: Any
+    ):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
-        super().__init__('bk ', intents=intents)
+
+        # lean mode keeps no members around, features that need them chunk their guild when they run
+        if lean:
+            member_cache_flags = member_cache_flags or discord.MemberCacheFlags.none()
+            options.setdefault('chunk_guilds_at_startup', False)
+        if member_cache_flags is not None:
+            options['member_cache_flags'] = member_cache_flags
+
+        super().__init__('bk ', intents=intents, tree_cls=BookShelfTree, **options)
+
+        self.lean = lean
+        self.lazy = lazy
+        # cluster processes share the working directory, so each one keeps its own files
+        self.cluster_id = cluster_id
+        self.manifest = ExtensionManifest(cluster_path(self.manifest_path, cluster_id))
+        self.pending_extensions: dict[str, asyncio.Lock] = {}
+        self.lazy_listeners: dict[str, set[str]] = {}
+        self.lazy_dispatches: set[asyncio.Task[None]] = set()
+        self.extension_timings: dict[str, ExtensionTiming] = {}
+        self.started_at = time.perf_counter()
+        self.setup_time: Optional[float] = None
+        self.time_to_ready: Optional[float] = None
 
         self.session: aiohttp.ClientSession = MISSING
+        self.http_cache: HTTPCache = MISSING
+        if http_cache_dir is not None and cluster_id is not None:
+            http_cache_dir = os.path.join(http_cache_dir, f'cluster-{cluster_id}')
+        self.http_cache_dir = http_cache_dir
+        self.storage: Storage = MISSING
+        self.metrics = Metrics(metrics_path)
+        self.outbound = Outbound(metrics=self.metrics)
+        self.fetches: SingleFlight[Any] = SingleFlight()
+        self.failed_fetches: dict[Hashable, tuple[float, FailedFetch]] = {}
+        self.loop_monitor = LoopLagMonitor(threshold=self.slow_callback_duration, metrics=self.metrics)
+        self.checkpoints = Checkpoints(interval=self.checkpoint_interval, metrics=self.metrics, cluster=cluster_id)
+        self.shutdown_task: Optional[asyncio.Task[None]] = None
+
+        ManagedView.max_live = self.max_live_views
+        ManagedView.metrics = self.metrics
 
         self.nasa_api_key = nasa_api_key
         if self.nasa_api_key:
@@ -71,35 +277,316 @@ class BookShelf(commands.Bot):
 
     async def setup_hook(self) -> None:
         self.session = aiohttp.ClientSession()
+        self.http_cache = HTTPCache(self.session, directory=self.http_cache_dir)
+        self.storage = Storage()
+        self.metrics.exporter.start()
+        self.loop_monitor.start()
+        self.checkpoints.saver.start()
 
+        start = time.perf_counter()
+        await self.manifest.from_file()
+
+        eager: list[str] = []
         for extension in self.initial_extensions:
-            await self.load_extension(extension)
+            if self.lazy and extension in self.lazy_extensions and extension in self.manifest:
+                self.stub_extension(extension)
+            else:
+                eager.append(extension)
+
+        await self.load_extensions(eager)
+
+        await self.manifest.to_file()
+        self.setup_time = time.perf_counter() - start
+        _log.info(
+            'Loaded %s extensions in %.0fms, %s deferred',
+            len(self.extension_timings),
+            self.setup_time * 1000,
+            len(self.pending_extensions)
+        )
+
+    async def on_ready(self):
+        if self.time_to_ready is None:
+            self.time_to_ready = time.perf_counter() - self.started_at
+            _log.info('Ready in %.0fms', self.time_to_ready * 1000)
+
+        print(f'Logged in as {self.user} | {self.user.id}')
+
+    async def on_app_command_completion(
+            self,
+            interaction: discord.Interaction,
+            command: Union[app_commands.Command, app_commands.ContextMenu]
+    ):
+        self.tree.end_measurement(interaction, failed=False)
+
+    async def on_command_completion(self, ctx: commands.Context) -> None:
+        if ctx.interaction is not None:
+            self.tree.end_measurement(ctx.interaction, failed=False)
+
+    async def on_command_error(self, ctx: commands.Context, error: commands.CommandError, /) -> None:
+        # hybrid commands invoked as slash commands report failures here, the tree never sees them
+        if ctx.interaction is not None:
+            self.tree.end_measurement(ctx.interaction, failed=True)
+        await super().on_command_error(ctx, error)
+
+    async def invoke(self, ctx: commands.Context) -> None:
+        if ctx.command is None or 'lazy_extension' in ctx.command.extras:
+            # stubs invoke the real command themselves once it's loaded
+            return await super().invoke(ctx)
+
+        with self.metrics.track('prefix', ctx.command.qualified_name) as measurement:
+            await super().invoke(ctx)
+            measurement.failed = ctx.command_failed
+
+    # extensions
+
+    async def load_extensions(self, extensions: list[str]) -> None:
+        # concurrent on the loop, slow cog_loads overlap but imports stay on this thread
+        tasks: dict[str, asyncio.Task[None]] = {}
+
+        async def load(extension: str) -> None:
+            for dependency in self.extension_dependencies.get(extension, ()):
+                if dependency in tasks:
+                    await tasks[dependency]
+            await self.timed_load_extension(extension)
+
+        for extension in extensions:
+            tasks[extension] = asyncio.create_task(load(extension))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            # a failed extension stops startup, the rest shouldn't keep loading behind it
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+    async def timed_load_extension(self, extension: str, *, lazy: bool = False) -> None:
+        timing = ExtensionTiming(extension, lazy=lazy)
+        self.extension_timings[extension] = timing
+
+        start = time.perf_counter()
+        await self.load_extension(extension)
+        timing.total_time = time.perf_counter() - start
+        # add_cog fills in cog_load_time, the rest is importing and setup
+        timing.import_time = timing.total_time - timing.cog_load_time
+
+        self.manifest.record(self, extension)
+        _log.info('Loaded %s in %s', extension, timing)
+
+    async def add_cog(self, cog: commands.Cog, /, **kwargs: Any) -> None:
+        start = time.perf_counter()
+        await super().add_cog(cog, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        owners = [name for name in self.extension_timings if is_submodule(name, cog.__module__)]
+        if owners:
+            self.extension_timings[max(owners, key=len)].cog_load_time += elapsed
+
+    def stub_extension(self, extension: str) -> None:
+        entry = self.manifest[extension]
+
+        for name, aliases in entry['commands']:
+            self.add_command(make_command_stub(self, extension, name, aliases))
+        for payload in entry['app_commands']:
+            self.tree.add_command(AppCommandStub(extension, payload))
+        for listener in entry['listeners']:
+            self.lazy_listeners.setdefault(listener, set()).add(extension)
+
+        self.pending_extensions.setdefault(extension, asyncio.Lock())
+
+    def unstub_extension(self, extension: str) -> None:
+        for command in list(self.commands):
+            if command.extras.get('lazy_extension') == extension:
+                self.remove_command(command.name)
+        for app_command in self.tree.get_commands():
+            if isinstance(app_command, AppCommandStub) and app_command.extras['lazy_extension'] == extension:
+                self.tree.remove_command(app_command.name)
+
+    async def load_lazy_extension(self, extension: str) -> None:
+        lock = self.pending_extensions.get(extension)
+        if lock is None:
+            return
+
+        async with lock:
+            if extension in self.extensions:
+                return
+
+            self.unstub_extension(extension)
+            try:
+                await self.timed_load_extension(extension, lazy=True)
+            except Exception:
+                self.stub_extension(extension)
+                raise
+
+            # only now, the cog's own listeners see everything dispatched from here on
+            for extensions in self.lazy_listeners.values():
+                extensions.discard(extension)
+            del self.pending_extensions[extension]
+            await self.manifest.to_file()
+
+    async def load_lazy_extensions(self) -> None:
+        for extension in list(self.pending_extensions):
+            await self.load_lazy_extension(extension)
+
+    def dispatch(self, event_name: str, /, *args: Any, **kwargs: Any) -> None:
+        super().dispatch(event_name, *args, **kwargs)
+
+        method = 'on_' + event_name
+        for extension in self.lazy_listeners.get(method, ()):
+            if self.extension_cogs(extension):
+                # the cog was added mid-load, super().dispatch already reached its listeners
+                continue
+            # queued behind the extension's lock and replayed in order once it's loaded
+            task = self.loop.create_task(self.dispatch_lazy(extension, method, *args, **kwargs))
+            self.lazy_dispatches.add(task)
+            task.add_done_callback(self.lazy_dispatches.discard)
+
+    def extension_cogs(self, extension: str) -> list[commands.Cog]:
+        return [cog for cog in self.cogs.values() if is_submodule(extension, cog.__module__)]
+
+    async def dispatch_lazy(self, extension: str, method: str, /, *args: Any, **kwargs: Any) -> None:
+        await self.load_lazy_extension(extension)
+
+        for cog in self.extension_cogs(extension):
+            for name, listener in cog.get_listeners():
+                if name == method:
+                    self._schedule_event(listener, method, *args, **kwargs)
+
+    async def shutdown(self) -> None:
+        _log.info('Shutting down, saving state')
+        await self.close()
+
+    def _on_sigterm(self) -> None:
+        if self.shutdown_task is None:
+            self.shutdown_task = asyncio.create_task(self.shutdown())
 
     async def close(self) -> None:
+        await self.checkpoints.close(self.shutdown_deadline)
+        self.loop_monitor.stop()
+        await self.outbound.close()
+        if self.metrics.exporter.is_running():
+            self.metrics.exporter.cancel()
+            await self.metrics.write()
         if self.session and not self.session.closed:
             await self.session.close()
         await super().close()
+        if self.storage:
+            await self.storage.close()
 
-    async def on_ready(self):
-        print(f'Logged in as {self.user} | {self.user.id}')
-
-    def standard_run(self, token: str, reconnect: bool = True, log: bool = True) -> None:
+    def standard_run(
+            self,
+            token: str,
+            reconnect: bool = True,
+            log: bool = True,
+            *,
+            debug: bool = False,
+            log_level: int = logging.INFO,
+            use_uvloop: bool = True
+    ) -> None:
         async def runner():
-            if log:
-                setup_logging(self.logging_formatter)
-
             async with self:
+                try:
+                    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self._on_sigterm)
+                except NotImplementedError:
+                    # windows
+                    pass
                 await self.start(token, reconnect=reconnect)
 
-        asyncio.run(runner(), debug=True)
+        listener = None
+        if log:
+            listener = setup_logging(
+                self.logging_formatter,
+                log_level,
+                directory=self.log_directory,
+                max_bytes=self.log_max_bytes,
+                when=self.log_rotate_when,
+                backup_count=self.log_backup_count,
+                compress=self.log_compress,
+                debug_sample_rate=self.log_debug_sample_rate
+            )
+
+        # debug mode is very slow, the loop monitor covers slow callbacks without it
+        loop_factory = uvloop.new_event_loop if use_uvloop and uvloop is not None else None
+        try:
+            with asyncio.Runner(debug=debug, loop_factory=loop_factory) as asyncio_runner:
+                if debug:
+                    asyncio_runner.get_loop().slow_callback_duration = self.slow_callback_duration
+                asyncio_runner.run(runner())
+        finally:
+            if listener is not None:
+                listener.stop()
 
     # extra utils
 
-    @staticmethod
-    async def get_or_fetch(async_method: Callable[[int], Coroutine[Any, Any, T]], snowflake: int) -> T:
+    async def get_members(self, guild: discord.Guild) -> list[discord.Member]:
+        if guild.chunked:
+            return guild.members
+        # discord.py shares one chunk request between concurrent callers,
+        # and without the joined cache flag the members aren't kept afterwards
+        return await guild.chunk(cache=False)
+
+    def owns_guild(self, guild_id: int) -> bool:
+        # background loops check this so that with several processes each guild is only handled once
+        if self.shard_count is None:
+            return True
+
+        shard_id = (guild_id >> 22) % self.shard_count
+        shard_ids: Optional[list[int]] = getattr(self, 'shard_ids', None)
+        if shard_ids is not None:
+            return shard_id in shard_ids
+        return self.shard_id is None or shard_id == self.shard_id
+
+    async def get_or_fetch(self, async_method: Callable[[int], Coroutine[Any, Any, T]], snowflake: int) -> T:
+        owner = async_method.__self__  # type: ignore
         sync_method_name: str = async_method.__name__.replace('fetch', 'get')
-        sync_method: Callable[[int], T] = getattr(
-            async_method.__self__, sync_method_name   # type: ignore
-        )
+        sync_method: Callable[[int], Optional[T]] = getattr(owner, sync_method_name)
+
+        cached = sync_method(snowflake)
+        if cached is not None:
+            return cached
+
+        key = (owner, async_method.__name__, snowflake)
+        failed = self.failed_fetches.get(key)
+        if failed is not None:
+            expires, error = failed
+            if time.monotonic() < expires:
+                raise error.to_exception()
+            del self.failed_fetches[key]
+
+        return await self.fetches.run(key, self._fetch, key, async_method, snowflake)
+
+    async def _fetch(self, key: Hashable, async_method: Callable[[int], Coroutine[Any, Any, T]], snowflake: int) -> T:
+        try:
+            return await async_method(snowflake)
+        except (discord.NotFound, discord.Forbidden) as error:
+            if len(self.failed_fetches) >= self.negative_cache_size:
+                # entries are inserted in expiry order, so the first is the oldest
+                del self.failed_fetches[next(iter(self.failed_fetches))]
+            self.failed_fetches[key] = (time.monotonic() + self.negative_cache_ttl, FailedFetch.from_exception(error))
+            raise
+
+    async def get_or_fetch_many(
+            self,
+            async_method: Callable[[int], Coroutine[Any, Any, T]],
+            snowflakes: Iterable[int],
+            *,
+            concurrency: int = 8
+    ) -> dict[int, T]:
+        # ids that can't be fetched are left out of the result
+        semaphore = asyncio.Semaphore(concurrency)
+        snowflakes = list(dict.fromkeys(snowflakes))
+
+        async def resolve(snowflake: int) -> Optional[T]:
+            async with semaphore:
+                try:
+                    return await self.get_or_fetch(async_method, snowflake)
+                except discord.HTTPException:
+                    return None
+
+        results = await asyncio.gather(*(resolve(snowflake) for snowflake in snowflakes))
+        return {snowflake: result for snowflake, result in zip(snowflakes, results) if result is not None}
+
 
-        return sync_method(snowflake) or await async_method(snowflake)
+class AutoShardedBookShelf(BookShelf, commands.AutoShardedBot):
+    pass
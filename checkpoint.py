@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Optional
+
+from discord.ext import tasks
+
+from metrics import Metrics
+
+
+_log = logging.getLogger(__name__)
+
+
+Snapshot = Callable[[], Any]
+
+
+@dataclasses.dataclass
+class Checkpoint:
+    name: str
+    path: str
+    snapshot: Snapshot
+    indent: Optional[int] = None
+    digest: Optional[bytes] = None
+    writes: int = 0
+    skipped: int = 0
+    # set by mark_dirty, a clean checkpoint isn't snapshotted at all
+    dirty: bool = True
+    # the write running in a thread, it carries on even if whoever started it is cancelled
+    pending: Optional[asyncio.Future[Optional[bytes]]] = None
+
+
+def _write(path: str, dumped: bytes, digest: Optional[bytes]) -> Optional[bytes]:
+    new_digest = hashlib.blake2b(dumped, digest_size=16).digest()
+    if new_digest == digest:
+        return None
+
+    with open(f'{path}.tmp', 'wb') as file:
+        file.write(dumped)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(f'{path}.tmp', path)
+    return new_digest
+
+
+def cluster_path(path: str, cluster: Optional[int]) -> str:
+    if cluster is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f'{root}-{cluster}{ext}'
+
+
+def _read(path: str) -> Any:
+    with open(path, 'rb') as file:
+        return json.loads(file.read())
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def _cluster_copies(path: str) -> list[str]:
+    # oldest first, so a later copy wins wherever they disagree
+    root, ext = os.path.splitext(path)
+    copies = [
+        copy for copy in glob.glob(f'{glob.escape(root)}-*{ext}')
+        if copy[len(root) + 1:len(copy) - len(ext)].isdigit()
+    ]
+    return sorted(copies, key=os.path.getmtime)
+
+
+def merge(base: Any, other: Any) -> Any:
+    """The default way copies of a checkpoint are merged, keys of ``other`` win and lists keep every item once."""
+    if isinstance(base, dict) and isinstance(other, dict):
+        return {**base, **other}
+    if isinstance(base, list) and isinstance(other, list):
+        return base + [item for item in other if item not in base]
+    return other
+
+
+Merge = Callable[[Any, Any], Any]
+
+
+class Checkpoints:
+    """Periodically saves registered in-memory state to JSON files.
+
+    Whoever changes the state calls ``mark_dirty``, anything that wasn't
+    marked since its last save costs nothing on a flush. ``snapshot`` is
+    called and serialized on the loop, so nothing it returns is shared with
+    the thread that writes the file. A file is only rewritten when its
+    contents changed, one write at a time, and it's replaced atomically so a
+    crash mid-write leaves the previous checkpoint.
+    """
+
+    def __init__(self, *, interval: float = 60, metrics: Optional[Metrics] = None, cluster: Optional[int] = None):
+        self.metrics = metrics
+        self.cluster = cluster
+        self.checkpoints: dict[str, Checkpoint] = {}
+        self.lock = asyncio.Lock()
+        self.last_flush: Optional[float] = None
+        self.closed = False
+
+        self.saver.change_interval(seconds=interval)
+
+    def register(self, name: str, path: str, snapshot: Snapshot, *, indent: Optional[int] = None) -> None:
+        self.checkpoints[name] = Checkpoint(name, self.path(path), snapshot, indent)
+
+    async def unregister(self, name: str) -> None:
+        if name in self.checkpoints:
+            # cogs unload after close, the last flush already ran or ran out of time
+            if not self.closed:
+                await self.flush(name)
+            del self.checkpoints[name]
+
+    def mark_dirty(self, name: str) -> None:
+        checkpoint = self.checkpoints.get(name)
+        if checkpoint is not None:
+            checkpoint.dirty = True
+
+    def path(self, path: str) -> str:
+        # every cluster process writes its own copy, they'd clobber each other's otherwise
+        return cluster_path(path, self.cluster)
+
+    async def load(self, path: str, default: Any = None, *, merge: Merge = merge) -> Any:
+        """Reads the state saved at ``path``, or ``default`` if there's none.
+
+        A cluster starts from whichever of its own copy and the shared file was
+        written last. Without a cluster, the copies clusters wrote since the
+        shared file are merged into it with ``merge`` so a single process doesn't
+        lose what they saved, the next flush writes the result back.
+        """
+        if self.cluster is not None:
+            candidates = [candidate for candidate in (self.path(path), path) if _mtime(candidate) is not None]
+            if not candidates:
+                return default
+            return await self._read(max(candidates, key=_mtime), default)
+
+        data = await self._read(path, default)
+        shared = _mtime(path)
+        for copy in await asyncio.to_thread(_cluster_copies, path):
+            if shared is not None and (_mtime(copy) or 0) <= shared:
+                continue
+            copied = await self._read(copy, None)
+            if copied is not None:
+                data = merge(data, copied)
+        return data
+
+    @staticmethod
+    async def _read(path: str, default: Any) -> Any:
+        try:
+            return await asyncio.to_thread(_read, path)
+        except (OSError, json.JSONDecodeError):
+            return default
+
+    async def _save(self, checkpoint: Checkpoint) -> None:
+        if checkpoint.pending is not None:
+            await asyncio.wait([checkpoint.pending])
+        if not checkpoint.dirty:
+            checkpoint.skipped += 1
+            return
+
+        # cleared before the snapshot, a change made while it's written marks it again
+        checkpoint.dirty = False
+        try:
+            dumped = json.dumps(checkpoint.snapshot(), indent=checkpoint.indent).encode()
+            checkpoint.pending = asyncio.ensure_future(
+                asyncio.to_thread(_write, checkpoint.path, dumped, checkpoint.digest)
+            )
+            digest = await asyncio.shield(checkpoint.pending)
+        except asyncio.CancelledError:
+            checkpoint.dirty = True
+            raise
+        except Exception:
+            _log.exception('Failed to checkpoint %s', checkpoint.name)
+            checkpoint.dirty = True
+            return
+
+        if digest is None:
+            checkpoint.skipped += 1
+        else:
+            checkpoint.digest = digest
+            checkpoint.writes += 1
+
+    async def flush(self, *names: str) -> None:
+        async with self.lock:
+            start = time.perf_counter()
+            checkpoints = [self.checkpoints[name] for name in names] if names else list(self.checkpoints.values())
+            for checkpoint in checkpoints:
+                await self._save(checkpoint)
+
+            self.last_flush = time.perf_counter() - start
+            if self.metrics is not None:
+                self.metrics.set_gauge('checkpoint_flush_seconds', self.last_flush)
+                self.metrics.set_gauge('checkpoint_writes', sum(c.writes for c in self.checkpoints.values()))
+
+    async def flush_with_deadline(self, deadline: float) -> bool:
+        try:
+            await asyncio.wait_for(self.flush(), timeout=deadline)
+        except asyncio.TimeoutError:
+            _log.warning('Checkpoint flush did not finish within %ss', deadline)
+            return False
+        return True
+
+    async def close(self, deadline: float) -> None:
+        """Saves everything one last time, giving up after ``deadline`` seconds.
+
+        Checkpoints unregistered after this are dropped without flushing them
+        again, so unloading cogs can't hold up shutdown.
+        """
+        start = time.perf_counter()
+        self.saver.cancel()
+        await self.flush_with_deadline(deadline)
+        self.closed = True
+
+        pending = [c.pending for c in self.checkpoints.values() if c.pending is not None and not c.pending.done()]
+        if pending:
+            # writes already running are left to finish so they don't leave a temp file behind
+            await asyncio.wait(pending, timeout=max(deadline - (time.perf_counter() - start), 0))
+
+    @tasks.loop(seconds=60)
+    async def saver(self) -> None:
+        await self.flush()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            checkpoint.name: {'writes': checkpoint.writes, 'skipped': checkpoint.skipped}
+            for checkpoint in self.checkpoints.values()
+        }
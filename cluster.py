@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from typing import Any, Optional
+
+import aiohttp
+
+
+_log = logging.getLogger(__name__)
+
+
+async def recommended_shard_count(token: str) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            'https://discord.com/api/v10/gateway/bot',
+            headers={'Authorization': f'Bot {token}'}
+        ) as resp:
+            resp.raise_for_status()
+            return (await resp.json())['shards']
+
+
+def split_shards(shard_count: int, workers: int) -> list[list[int]]:
+    # contiguous ranges, the first ones get the remainder
+    workers = max(min(workers, shard_count), 1)
+    size, extra = divmod(shard_count, workers)
+
+    ranges = []
+    start = 0
+    for index in range(workers):
+        end = start + size + (index < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def run_worker(index: int, token: str, shard_ids: list[int], shard_count: int, options: dict[str, Any]) -> None:
+    from bot import AutoShardedBookShelf
+
+    bot = AutoShardedBookShelf(
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+        metrics_path=f'./metrics-{index}.prom',
+        cluster_id=index,
+        **options
+    )
+    # every worker rotates its own files
+    bot.log_directory = os.path.join(bot.log_directory, f'cluster-{index}')
+    bot.standard_run(token)
+
+
+class Cluster:
+    """Runs the bot as several processes, each owning a contiguous range of shards."""
+
+    def __init__(
+            self,
+            token: str,
+            *,
+            workers: Optional[int] = None,
+            shard_count: Optional[int] = None,
+            restart_delay: float = 5,
+            **options: Any
+    ):
+        self.token = token
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_count = shard_count
+        self.restart_delay = restart_delay
+        self.options = options
+
+        self.context = multiprocessing.get_context('spawn')
+        self.processes: dict[int, multiprocessing.process.BaseProcess] = {}
+        self.shard_ranges: list[list[int]] = []
+
+    def spawn(self, index: int) -> None:
+        process = self.context.Process(
+            target=run_worker,
+            args=(index, self.token, self.shard_ranges[index], self.shard_count, self.options),
+            name=f'bookshelf-cluster-{index}'
+        )
+        process.start()
+        self.processes[index] = process
+        _log.info('Started cluster %s with shards %s (pid %s)', index, self.shard_ranges[index], process.pid)
+
+    def run(self) -> None:
+        if self.shard_count is None:
+            self.shard_count = asyncio.run(recommended_shard_count(self.token))
+        self.shard_ranges = split_shards(self.shard_count, self.workers)
+
+        for index in range(len(self.shard_ranges)):
+            self.spawn(index)
+
+        try:
+            while self.processes:
+                for index, process in list(self.processes.items()):
+                    process.join(timeout=1)
+                    if process.is_alive():
+                        continue
+
+                    if process.exitcode == 0:
+                        del self.processes[index]
+                        continue
+
+                    _log.warning('Cluster %s exited with %s, restarting', index, process.exitcode)
+                    time.sleep(self.restart_delay)
+                    self.spawn(index)
+        except KeyboardInterrupt:
+            for process in self.processes.values():
+                process.terminate()
+            for process in self.processes.values():
+                process.join()
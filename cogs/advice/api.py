@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import json
 from typing import TYPE_CHECKING, ClassVar
 
 if TYPE_CHECKING:
@@ -11,14 +10,14 @@ class AdviceSlipClient:
     bot: BookShelf
 
     BASE: ClassVar[str] = 'https://api.adviceslip.com/advice'
+    SEARCH_TTL: ClassVar[float] = 24 * 60 * 60
 
     async def random_advice(self) -> dict:
-        async with self.bot.session.get(self.BASE) as resp:
-            text = await resp.text()  # for some reason resp.json() doesn't work
-            return json.loads(text)
+        # random advice is never cached
+        resp = await self.bot.http_cache.get(self.BASE)
+        return resp.json()
 
     async def search_advice(self, query: str) -> dict:
-        async with self.bot.session.get(f'{self.BASE}/search/{query}') as resp:
-            text = await resp.text()
-            return json.loads(text)
+        resp = await self.bot.http_cache.get(f'{self.BASE}/search/{query}', ttl=self.SEARCH_TTL)
+        return resp.json()
 
@@ -4,7 +4,7 @@ import asyncio
 import datetime
 import math
 import random
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, AsyncIterator
 
 import discord
 from discord import app_commands
@@ -54,8 +54,9 @@ class Anniversary(AnniversaryDatabase, commands.Cog):
     async def check_years(self) -> None:
         users = {k: v for k, v in await self.get_all_users()}
         now = discord.utils.utcnow()
+        sends: list[asyncio.Future[discord.Message]] = []
 
-        for user in self.bot.users:
+        async for user in self.iter_users():
             created_at = user.created_at
 
             if now >= datetime.datetime(
@@ -68,15 +69,29 @@ class Anniversary(AnniversaryDatabase, commands.Cog):
                 created_at.microsecond,
                 tzinfo=created_at.tzinfo
             ) and users.get(user.id, 0) != now.year and (now - created_at).days >= 365:
+                if not await self.claim_year(user, now.year):
+                    continue
+
                 year = math.ceil((now - user.created_at).days / 365)
                 embed = self.make_embed(user, year)
-                try:
-                    await user.send(embed=embed)
-                except (discord.HTTPException, AttributeError):
-                    pass
-                await self.add_year(user, now.year)
-
-                await asyncio.sleep(0.2)
+                sends.append(self.bot.outbound.send(user, embed=embed))
+
+        # closed DMs are expected, the results only need to be collected
+        await asyncio.gather(*sends, return_exceptions=True)
+
+    async def iter_users(self) -> AsyncIterator[discord.User | discord.Member]:
+        if not self.bot.lean:
+            for user in self.bot.users:
+                yield user
+            return
+
+        # lean mode caches no members, so guilds are chunked one at a time and dropped afterwards
+        seen: set[int] = set()
+        for guild in self.bot.guilds:
+            for member in await self.bot.get_members(guild):
+                if member.id not in seen:
+                    seen.add(member.id)
+                    yield member
 
     @check_years.before_loop
     async def wait_until_ready(self) -> None:
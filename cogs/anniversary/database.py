@@ -1,57 +1,52 @@
-from typing import Iterable
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable
 
-import aiosqlite
 import discord
 
+if TYPE_CHECKING:
+    from bot import BookShelf
+    from storage import Database
+
 
 MISSING = discord.utils.MISSING
 
 
 class AnniversaryDatabase:
+    bot: BookShelf
+
     def __init__(self):
-        self.db: aiosqlite.Connection = aiosqlite.connect('./cogs/anniversary/anniversary.db')
+        self.db: Database = MISSING
 
     async def cog_load(self) -> None:
-        await self.db
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                '''
-                CREATE TABLE IF NOT EXISTS "anniversaries" (
-                            user_id INT PRIMARY KEY,
-                            year INT
-                );
-                '''
-            )
-        await self.db.commit()
+        self.db = await self.bot.storage.open('./cogs/anniversary/anniversary.db')
+        await self.db.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS "anniversaries" (
+                        user_id INT PRIMARY KEY,
+                        year INT
+            );
+            '''
+        )
 
     async def cog_unload(self) -> None:
         await self.db.close()
 
-    async def add_year(self, user: discord.User, year: int) -> None:
-        async with self.db.cursor() as cursor:
-            try:
-                await cursor.execute(
-                    '''
-                    INSERT INTO "anniversaries" VALUES (?, ?);
-                    ''',
-                    (user.id, year)
-                )
-            except aiosqlite.IntegrityError:
-                await cursor.execute(
-                    '''
-                    UPDATE "anniversaries"
-                    SET user_id = ?, year = ?
-                    WHERE user_id = ?;
-                    ''',
-                    (user.id, year, user.id)
-                )
-        await self.db.commit()
+    async def claim_year(self, user: discord.User, year: int) -> bool:
+        # a user can share guilds with several cluster processes, only the one whose write lands sends the DM
+        changed = await self.db.execute(
+            '''
+            INSERT INTO "anniversaries" VALUES (?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET year = excluded.year
+            WHERE year != excluded.year;
+            ''',
+            (user.id, year)
+        )
+        return changed > 0
 
     async def get_all_users(self) -> Iterable[tuple[int, int]]:
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                '''
-                SELECT * FROM "anniversaries";
-                '''
-            )
-            return await cursor.fetchall()
+        return await self.db.fetchall(
+            '''
+            SELECT * FROM "anniversaries";
+            '''
+        )
@@ -159,6 +159,7 @@ class CustomCommands(CommandStorage, commands.Cog):
             if command.name == name and command.ctx.guild.id == ctx.guild.id:
                 if ctx.author.guild_permissions.administrator or command.ctx.author == str(ctx.author):
                     self.commands_to_store.remove(command)
+                    self.bot.checkpoints.mark_dirty('customcommands')
                     self.bot.remove_command(name)
                     await ctx.send('Command successfully deleted.')
                 else:
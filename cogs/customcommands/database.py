@@ -1,9 +1,7 @@
 from __future__ import annotations
 
-import json
 from typing import TYPE_CHECKING
 
-import aiofiles
 import discord
 from discord.ext import commands
 
@@ -69,26 +67,24 @@ class CommandStorage:
         custom_command.args = args
 
         self.commands_to_store.append(custom_command)
+        self.bot.checkpoints.mark_dirty('customcommands')
 
         return custom_command
 
-    async def to_file(self) -> None:
-        data = [command.to_dict() for command in self.commands_to_store]
-        dumped = json.dumps(data, indent=4)
+    def snapshot(self) -> list[dict]:
+        return [command.to_dict() for command in self.commands_to_store]
 
-        async with aiofiles.open('./cogs/customcommands/command_storage.json', 'w') as file:
-            await file.write(dumped)
+    @staticmethod
+    def merge(base: list[dict], other: list[dict]) -> list[dict]:
+        # command names are global to the bot, a later copy replaces a command of the same name
+        merged = {command_data['name']: command_data for command_data in base}
+        merged.update((command_data['name'], command_data) for command_data in other)
+        return list(merged.values())
 
     async def from_file(self) -> None:
-        async with aiofiles.open('./cogs/customcommands/command_storage.json', 'r') as file:
-            raw = await file.read()
-
-        try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            async with aiofiles.open('./cogs/customcommands/command_storage.json', 'w') as file:
-                await file.write('{}')
-            return await self.from_file()
+        data = await self.bot.checkpoints.load(
+            './cogs/customcommands/command_storage.json', [], merge=self.merge
+        )
 
         command_data: dict
         for command_data in data:
@@ -104,6 +100,9 @@ class CommandStorage:
 
     async def cog_load(self) -> None:
         await self.from_file()
+        self.bot.checkpoints.register(
+            'customcommands', './cogs/customcommands/command_storage.json', self.snapshot, indent=4
+        )
 
     async def cog_unload(self) -> None:
-        await self.to_file()
+        await self.bot.checkpoints.unregister('customcommands')
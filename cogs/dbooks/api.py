@@ -10,9 +10,10 @@ class DBooksClient:
     bot: BookShelf
 
     BASE: ClassVar[str] = 'https://www.dbooks.org/api'
+    SEARCH_TTL: ClassVar[float] = 6 * 60 * 60
 
     async def search(self, query: str, *, result: int = 0) -> dict:
-        async with self.bot.session.get(f'{self.BASE}/search/{query}') as resp:
-            data = await resp.json()
+        resp = await self.bot.http_cache.get(f'{self.BASE}/search/{query}', ttl=self.SEARCH_TTL)
+        data = resp.json()
         return data['books'][result]
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import collections
 from datetime import datetime
 from typing import TYPE_CHECKING, Any
 from aiosqlite import OperationalError
@@ -9,7 +10,7 @@ from discord import app_commands
 from discord.ext import commands, tasks
 
 from .database import DemocracyDatabase
-from utils import get_max, VirtualContext
+from utils import top_k, VirtualContext
 
 if TYPE_CHECKING:
     from bot import BookShelf
@@ -34,6 +35,9 @@ class Democracy(DemocracyDatabase, commands.Cog):
         elections = await self.get_end()
 
         for guild_id, time, channel_id in elections:
+            if not self.bot.owns_guild(guild_id):
+                continue
+
             time = datetime.fromisoformat(time)
             if time > discord.utils.utcnow():
                 continue
@@ -109,36 +113,18 @@ class Democracy(DemocracyDatabase, commands.Cog):
             await ctx.send('There is no election happening.', ephemeral=True)
             return
 
-        candidates_id: dict[int, int] = {}
-
-        for vote in data:
-            vote_id = vote[0]
-            candidates_id.setdefault(vote_id, 0)
-            candidates_id[vote_id] += 1
-
-        top: dict[int, int] = {}
-
-        for _ in range(5):
-            try:
-                highest = get_max(candidates_id)
-
-                if not highest:
-                    break
+        candidates_id = collections.Counter(vote[0] for vote in data)
+        top = dict(top_k(candidates_id, 5))
 
-                top[highest] = candidates_id[highest]
-                del candidates_id[highest]
-            except ValueError:
-                break
+        members = await self.bot.get_or_fetch_many(ctx.guild.fetch_member, top)
+        top: dict[discord.Member, int] = {  # type: ignore
+            members[k]: v for k, v in top.items() if k in members
+        }
 
         if len(top) < 1:
             await ctx.send('No one voted.')
             return
 
-        top: dict[discord.Member, int] = {  # type: ignore
-            await self.bot.get_or_fetch(ctx.guild.fetch_member, k): v
-            for k, v in top.items()
-        }
-
         embed = discord.Embed(
             title=f'{ctx.guild.name} Election Results',
             description=f'{list(top)[0].mention} has won the election!'  # type: ignore
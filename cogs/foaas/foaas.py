@@ -11,7 +11,7 @@ from discord.ext import commands
 from fuzzywuzzy import fuzz
 
 from .views import FOAASView, FOAASModal
-from utils import get_max
+from utils import top_k
 
 if TYPE_CHECKING:
     from bot import BookShelf
@@ -42,7 +42,8 @@ class FOAAS(commands.Cog):
     async def message_foaas(self, ctx: commands.Context):
         view = FOAASView(ctx.author)
         await ctx.send(view=view, ephemeral=True)
-        await view.wait()
+        if await view.wait():
+            return
 
         message = call_with_author(ctx, view.method, *view.args)
         await ctx.send(message)
@@ -80,24 +81,9 @@ class FOAAS(commands.Cog):
     async def foaas_type_autocomplete(self, interaction: discord.Interaction, current: str
                                       ) -> list[app_commands.Choice[str]]:
         current = current.lower()
-        highest: dict[app_commands.Choice[str], int] = {}
-        names: list[app_commands.Choice[str]] = []
-        for name in foaap.__all__:
-            name = name.lower()
-            highest[app_commands.Choice(
-                name=name.capitalize(), value=name
-            )] = fuzz.token_sort_ratio(current, name)
-
-        for _ in range(10):
-            if len(current) >= 3:
-                kwargs = {'greater_than': 50}
-            else:
-                kwargs = {}
-
-            option = get_max(highest, **kwargs)
-            if option:
-                names.append(option)
-                del highest[option]
+        scores = ((name, fuzz.token_sort_ratio(current, name)) for name in map(str.lower, foaap.__all__))
+        top = top_k(scores, 10, greater_than=50 if len(current) >= 3 else None)
+        names = [app_commands.Choice(name=name.capitalize(), value=name) for name, _ in top]
 
         names.sort(key=lambda v: v.name)
         return names
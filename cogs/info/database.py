@@ -1,11 +1,23 @@
+from __future__ import annotations
+
 import datetime
 import json
+from typing import TYPE_CHECKING
 
-import aiofiles
+import aiosqlite
 import discord
 
+if TYPE_CHECKING:
+    from bot import BookShelf
+    from storage import Database
+
+
+MISSING = discord.utils.MISSING
+
 
 class EmbedStorage:
+    bot: BookShelf
+
     conversion: dict[type, str] = {
         discord.User: 'user',
         discord.Member: 'member',
@@ -14,51 +26,68 @@ class EmbedStorage:
     }
 
     def __init__(self):
-        self.data: dict[str, list[discord.Embed]] = {}
+        self.db: Database = MISSING
 
-    def insert(self, id: int, embed: discord.Embed, type: str) -> None:
-        key = f'{id}_{type}'
-        self.data.setdefault(key, [])
-        self.data[key].append(embed)
+    async def insert(self, id: int, embed: discord.Embed, type: str) -> None:
+        await self.db.execute(
+            '''
+            INSERT INTO "embeds" VALUES (?, ?);
+            ''',
+            (f'{id}_{type}', json.dumps(embed.to_dict()))
+        )
 
-    def get(self, obj: discord.abc.Snowflake, date: datetime.datetime = None) -> discord.Embed | None:
+    async def get(self, obj: discord.abc.Snowflake, date: datetime.datetime = None) -> discord.Embed | None:
         if not date:
             return None
 
         key = f'{obj.id}_{self.conversion[type(obj)]}'
-        embeds = self.data.get(key)
-        if not embeds:
-            return None
+        rows = await self.db.fetchall(
+            '''
+            SELECT embed FROM "embeds"
+            WHERE key = ? ORDER BY rowid;
+            ''',
+            (key,)
+        )
 
-        for embed in embeds:
+        for data, in rows:
+            embed = discord.Embed.from_dict(json.loads(data))
             if not embed.timestamp:
                 continue
             if embed.timestamp.day == date.day:
                 return embed
 
     async def cog_load(self) -> None:
-        await self.from_file()
-
-    async def cog_unload(self) -> None:
-        await self.to_file()
+        # every cluster sees the same users, so this lives in the shared database instead of a checkpoint
+        self.db = await self.bot.storage.open('./cogs/info/embeds.db')
+        data = await self.bot.checkpoints.load('./cogs/info/embed_storage.json', {})
 
-    async def to_file(self) -> None:
-        data = {id: [embed.to_dict() for embed in embeds] for id, embeds in self.data.items()}
-        dumped = json.dumps(data, indent=4)
+        async def create(conn: aiosqlite.Connection) -> None:
+            await conn.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS "embeds" (
+                        key TEXT NOT NULL,
+                        embed TEXT NOT NULL
+                );
+                '''
+            )
+            await conn.execute(
+                '''
+                CREATE INDEX IF NOT EXISTS "embeds_key" ON "embeds" (key);
+                '''
+            )
 
-        async with aiofiles.open('./cogs/info/embed_storage.json', 'w') as file:
-            await file.write(dumped)
+            # the embeds used to be checkpointed to JSON, the first process to create the table copies them over
+            async with conn.execute('SELECT 1 FROM "embeds" LIMIT 1;') as cursor:
+                if await cursor.fetchone() is not None:
+                    return
+            await conn.executemany(
+                '''
+                INSERT INTO "embeds" VALUES (?, ?);
+                ''',
+                [(key, json.dumps(embed)) for key, embeds in data.items() for embed in embeds]
+            )
 
-    async def from_file(self) -> dict:
-        async with aiofiles.open('./cogs/info/embed_storage.json', 'r') as file:
-            raw = await file.read()
+        await self.db.write(create)
 
-        try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            async with aiofiles.open('./cogs/info/embed_storage.json', 'w') as file:
-                await file.write('{}')
-            return await self.from_file()
-
-        for id, embeds in data.items():
-            self.data[id] = [discord.Embed.from_dict(embed) for embed in embeds]
+    async def cog_unload(self) -> None:
+        await self.db.close()
@@ -14,9 +14,9 @@ def get_perms_name(perms: discord.Permissions) -> Generator[str, Any, Any]:
 
 
 class EmbedBuilder(EmbedStorage):
-    def build_user_embed(self, user: discord.User | discord.Member, date: datetime.datetime | None
+    async def build_user_embed(self, user: discord.User | discord.Member, date: datetime.datetime | None
                          ) -> discord.Embed:
-        maybe = self.get(user, date)
+        maybe = await self.get(user, date)
         if maybe:
             return maybe
 
@@ -38,18 +38,18 @@ class EmbedBuilder(EmbedStorage):
         )
 
         if isinstance(user, discord.User):
-            self.insert(user.id, embed, 'user')
+            await self.insert(user.id, embed, 'user')
 
         return embed
 
-    def build_member_embed(self, member: discord.Member, date: datetime.datetime | None) -> discord.Embed:
+    async def build_member_embed(self, member: discord.Member, date: datetime.datetime | None) -> discord.Embed:
         assert member.joined_at is not None
 
-        maybe = self.get(member, date)
+        maybe = await self.get(member, date)
         if maybe:
             return maybe
 
-        embed = self.build_user_embed(member, date)
+        embed = await self.build_user_embed(member, date)
         embed.add_field(
             name='Joined Server',
             value=discord.utils.format_dt(member.joined_at)
@@ -64,12 +64,12 @@ class EmbedBuilder(EmbedStorage):
             value=', '.join(get_perms_name(member.guild_permissions))
         )
 
-        self.insert(member.id, embed, 'member')
+        await self.insert(member.id, embed, 'member')
 
         return embed
 
     async def build_guild_embed(self, guild: discord.Guild, date: datetime.datetime | None) -> discord.Embed:
-        maybe = self.get(guild, date)
+        maybe = await self.get(guild, date)
         if maybe:
             return maybe
 
@@ -118,12 +118,12 @@ class EmbedBuilder(EmbedStorage):
             value=' '.join(role.mention for role in reversed(guild.roles))
         )
 
-        self.insert(guild.id, embed, 'guild')
+        await self.insert(guild.id, embed, 'guild')
 
         return embed
 
-    def build_role_embed(self, role: discord.Role, date: datetime.datetime | None) -> discord.Embed:
-        maybe = self.get(role, date)
+    async def build_role_embed(self, role: discord.Role, date: datetime.datetime | None) -> discord.Embed:
+        maybe = await self.get(role, date)
         if maybe:
             return maybe
 
@@ -166,6 +166,6 @@ class EmbedBuilder(EmbedStorage):
 
         embed.set_footer(text=f'Role ID: {role.id}', icon_url=icon)
 
-        self.insert(role.id, embed, 'role')
+        await self.insert(role.id, embed, 'role')
 
         return embed
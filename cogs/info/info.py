@@ -32,9 +32,9 @@ class Info(EmbedBuilder, commands.Cog):
                               user: Optional[discord.Member | discord.User] = commands.Author,
                               date: datetime.datetime = date_parameter):
         if isinstance(user, discord.Member):
-            embed = self.build_member_embed(user, date)
+            embed = await self.build_member_embed(user, date)
         else:
-            embed = self.build_user_embed(user, date)
+            embed = await self.build_user_embed(user, date)
 
         await ctx.send(embed=embed)
 
@@ -59,5 +59,5 @@ class Info(EmbedBuilder, commands.Cog):
     )
     async def hybrid_roleinfo(self, ctx: commands.Context, role: discord.Role,
                               date: datetime.datetime = date_parameter):
-        embed = self.build_role_embed(role, date)
+        embed = await self.build_role_embed(role, date)
         await ctx.send(embed=embed)
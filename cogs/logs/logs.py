@@ -29,10 +29,29 @@ class MobileSupportFlags(commands.FlagConverter, delimiter=' ', prefix='--'):
 
 
 class Logs(commands.Cog):
+    state_attributes: tuple[str, ...] = ('snipes', 'managers')
+
     def __init__(self, bot: BookShelf):
         self.bot = bot
         self.snipes: dict[int, discord.Message] = {}
         self.managers: dict[int, Manager] = {}
+        self.toggler_views = get_views()
+
+    async def cog_load(self) -> None:
+        data = await self.bot.checkpoints.load('./cogs/logs/managers.json', {})
+        self.managers = {int(guild_id): Manager(enabled) for guild_id, enabled in data.items()}
+        self.bot.checkpoints.register('logs', './cogs/logs/managers.json', self.snapshot)
+
+        for view in self.toggler_views:
+            self.bot.add_view(view)
+
+    async def cog_unload(self) -> None:
+        for view in self.toggler_views:
+            view.stop()
+        await self.bot.checkpoints.unregister('logs')
+
+    def snapshot(self) -> dict[int, dict[str, bool]]:
+        return {guild_id: dict(manager.enabled) for guild_id, manager in self.managers.items()}
 
     # sniping
     @commands.Cog.listener()
@@ -123,6 +142,9 @@ class Logs(commands.Cog):
         view = InteractionCreator(ctx.author, timeout=None)
         await ctx.send(embed=embed, view=view)
         await view.wait()
+        if not view.clicked:
+            await ctx.send('This button expired, run the command again.')
+            return
         await view.interaction.response.defer()
 
         overwrites = {
@@ -148,10 +170,11 @@ class Logs(commands.Cog):
             title='Event Toggler'
         )
         await channel.send(embed=embed)
-        manager, views = get_views()
-        for view in views:
-            await channel.send(view=view)
+        manager = Manager({})
         self.managers[ctx.guild.id] = manager
+        self.bot.checkpoints.mark_dirty('logs')
+        for view in self.toggler_views:
+            await channel.send(view=view.render(manager))
 
     @hybrid_logging.command(
         name='disable',
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import dataclasses
-from typing import Iterable
+from typing import Iterable, Optional
 import discord
 
 event_names: tuple[tuple[str, ...], ...] = (
@@ -58,43 +58,52 @@ event_names: tuple[tuple[str, ...], ...] = (
 
 
 class EventButton(discord.ui.Button['EventTogglerView']):
-    def __init__(self, name: str, row: int):
+    def __init__(self, name: str, row: int, enabled: bool = True):
         super().__init__(
             label=name,
             custom_id=name.replace(' ', '_'),
-            style=discord.ButtonStyle.green,
+            style=discord.ButtonStyle.green if enabled else discord.ButtonStyle.red,
             row=row
         )
 
     async def callback(self, interaction: discord.Interaction) -> None:
         await interaction.response.defer()
-        self.style = discord.ButtonStyle.red
-        await interaction.message.edit(view=self.view)
-        self.view.manager.enabled[self.label] = not (self.view.manager.enabled.get(self.label, True))
+        managers: dict[int, Manager] = interaction.client.get_cog('Logs').managers  # type: ignore
+        manager = managers.setdefault(interaction.guild_id, Manager({}))  # type: ignore
+
+        manager.enabled[self.label] = not manager.enabled.get(self.label, True)
+        interaction.client.checkpoints.mark_dirty('logs')  # type: ignore
+        await interaction.message.edit(view=self.view.render(manager))
 
 
 class EventTogglerView(discord.ui.View):
-    def __init__(self, manager: Manager, names: Iterable[tuple[str]]):
+    """One persistent view per group of events serves every server.
+
+    What each server has toggled lives in its ``Manager``, messages are sent
+    and edited with stopped copies rendered from it.
+    """
+
+    def __init__(self, names: Iterable[tuple[str, ...]], manager: Optional[Manager] = None):
         super().__init__(timeout=None)
-        self.manager = manager
+        self.names = tuple(names)
 
-        for number, more_names in enumerate(names):
+        for number, more_names in enumerate(self.names):
             for name in more_names:
-                self.add_item(EventButton(name, row=number))
-
-
-def get_views() -> tuple[Manager, list[EventTogglerView]]:
-    manager = Manager({})
-    first = event_names[:4]
-    second = event_names[4:8]
-    third = event_names[8:]
-    return (manager,
-            [
-                EventTogglerView(manager, first),
-                EventTogglerView(manager, second),
-                EventTogglerView(manager, third)
-            ]
-    )
+                enabled = manager is None or manager.enabled.get(name, True)
+                self.add_item(EventButton(name, row=number, enabled=enabled))
+
+    def render(self, manager: Manager) -> EventTogglerView:
+        view = EventTogglerView(self.names, manager)
+        view.stop()
+        return view
+
+
+def get_views() -> list[EventTogglerView]:
+    return [
+        EventTogglerView(event_names[:4]),
+        EventTogglerView(event_names[4:8]),
+        EventTogglerView(event_names[8:])
+    ]
 
 
 @dataclasses.dataclass
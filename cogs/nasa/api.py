@@ -14,6 +14,8 @@ class NASAClient:
     bot: BookShelf
 
     BASE: ClassVar[str] = 'https://api.nasa.gov'
+    APOD_TTL: ClassVar[float] = 60 * 60
+    MARS_TTL: ClassVar[float] = 24 * 60 * 60
 
     def cleanup_params(self, params: dict[KT, VT]) -> dict[KT, VT]:
         params = {k: v for k, v in params.items() if v is not None}
@@ -26,11 +28,13 @@ class NASAClient:
             'count': count,
             'thumbs': str(thumbs)
         })
-        async with self.bot.session.get(f'{self.BASE}/planetary/apod', params=params) as resp:
-            return await resp.json()
+        # a count asks for random pictures, so only date lookups are cached
+        ttl = None if count is not None else self.APOD_TTL
+        resp = await self.bot.http_cache.get(f'{self.BASE}/planetary/apod', params=params, ttl=ttl)
+        return resp.json()
 
     async def mars(self, rover: Literal['curiosity', 'opportunity', 'spirit']) -> dict:
         params = self.cleanup_params({'sol': 1000})
-        async with self.bot.session.get(f'{self.BASE}/mars-photos/api/v1/rovers/{rover}/photos',
-                                        params=params) as resp:
-            return await resp.json()
+        resp = await self.bot.http_cache.get(f'{self.BASE}/mars-photos/api/v1/rovers/{rover}/photos',
+                                             params=params, ttl=self.MARS_TTL)
+        return resp.json()
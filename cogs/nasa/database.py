@@ -1,63 +1,58 @@
-import aiosqlite
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 import discord
 
+if TYPE_CHECKING:
+    from bot import BookShelf
+    from storage import Database as Storage
+
+
+MISSING = discord.utils.MISSING
+
 
 class Database:
+    bot: BookShelf
+
     def __init__(self):
-        self.db: aiosqlite.Connection = aiosqlite.connect('./cogs/nasa/channels.db')
+        self.db: Storage = MISSING
 
     async def cog_load(self):
-        await self.db
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                '''
-                CREATE TABLE IF NOT EXISTS "channels" (
-                            guild_id INT PRIMARY KEY,
-                            channel_id INT
-                );
-                '''
-            )
-        await self.db.commit()
+        self.db = await self.bot.storage.open('./cogs/nasa/channels.db')
+        await self.db.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS "channels" (
+                        guild_id INT PRIMARY KEY,
+                        channel_id INT
+            );
+            '''
+        )
 
     async def cog_unload(self):
         await self.db.close()
 
     async def add_channel(self, channel: discord.abc.GuildChannel) -> None:
-        async with self.db.cursor() as cursor:
-            try:
-                await cursor.execute(
-                    '''
-                    INSERT INTO "channels" VALUES (?, ?);
-                    ''',
-                    (channel.guild.id, channel.id)
-                )
-            except aiosqlite.IntegrityError:
-                await cursor.execute(
-                    '''
-                    UPDATE "channels" 
-                    SET channel_id = ?
-                    WHERE guild_id = ?;
-                    ''',
-                    (channel.id, channel.guild.id)
-                )
-        await self.db.commit()
+        await self.db.execute(
+            '''
+            INSERT INTO "channels" VALUES (?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET channel_id = excluded.channel_id;
+            ''',
+            (channel.guild.id, channel.id)
+        )
 
     async def delete_channel(self, guild: discord.Guild) -> None:
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                '''
-                DELETE FROM "channels"
-                WHERE guild_id = ?;
-                ''',
-                (guild.id,)
-            )
-        await self.db.commit()
+        await self.db.execute(
+            '''
+            DELETE FROM "channels"
+            WHERE guild_id = ?;
+            ''',
+            (guild.id,)
+        )
 
     async def get_channels(self):
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                '''
-                SELECT channel_id FROM "channels";
-                '''
-            )
-            return await cursor.fetchall()
+        return await self.db.fetchall(
+            '''
+            SELECT guild_id, channel_id FROM "channels";
+            '''
+        )
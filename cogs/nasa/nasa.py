@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
 import random
 from typing import TYPE_CHECKING, Literal, Optional
@@ -53,38 +54,51 @@ class NASA(Database, NASAClient, commands.Cog):
 
     async def cog_load(self):
         await super().cog_load()
+        self.dates_done = await self.bot.checkpoints.load('./cogs/nasa/dates_done.json', [])
+        self.bot.checkpoints.register('nasa', './cogs/nasa/dates_done.json', lambda: list(self.dates_done))
         self.first_start = True
         self.autopost_apod.start()
 
     async def cog_unload(self):
         self.first_start = False
         self.autopost_apod.cancel()
+        await self.bot.checkpoints.unregister('nasa')
         await super().cog_unload()
 
     @tasks.loop(minutes=20)
     async def autopost_apod(self):
         date = discord.utils.utcnow().strftime('%Y-%m-%d')
-        if not await self.apod(date):
+        data = await self.apod(date)
+        if not data:
             if not self.first_start:
                 return
 
             date = (discord.utils.utcnow() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
-            if not await self.apod(date):
+            data = await self.apod(date)
+            if not data:
                 return
 
         if date in self.dates_done:
             return
+
+        if data.get('code') == 404:
+            data = await self.apod((discord.utils.utcnow() - datetime.timedelta(days=1)).strftime('%Y-%m-%d'))
+        # the APOD is fetched once here, a retried send only repeats the send itself
+        embed = self.apod_embed(data)
+
         self.dates_done.append(date)
+        self.bot.checkpoints.mark_dirty('nasa')
 
-        for channel_tuple in await self.get_channels():
-            channel_id = channel_tuple[0]
-            try:
-                channel = await self.bot.get_or_fetch(self.bot.fetch_channel, channel_id)
-            except discord.HTTPException:
-                continue
+        channels = await self.bot.get_or_fetch_many(
+            self.bot.fetch_channel,
+            (channel_id for guild_id, channel_id in await self.get_channels() if self.bot.owns_guild(guild_id))
+        )
 
-            ctx = VirtualContext(channel=channel, author=None)
-            await self.hybrid_apod.callback(self, ctx, date)
+        sends = [
+            self.bot.outbound.send(channel, embed=embed, view=ExplanationView(data['explanation'], None))
+            for channel in channels.values()
+        ]
+        await asyncio.gather(*sends, return_exceptions=True)
 
     @autopost_apod.before_loop
     async def wait_until_ready(self):
@@ -150,6 +164,12 @@ class NASA(Database, NASAClient, commands.Cog):
             data = await self.apod(count=1)
             data = data[0]
 
+        view = ExplanationView(data['explanation'], ctx.author)
+
+        await ctx.send(embed=self.apod_embed(data), view=view)
+
+    @staticmethod
+    def apod_embed(data: dict) -> discord.Embed:
         embed = discord.Embed(
             title=data['title'],
             url=data['url'],
@@ -162,10 +182,7 @@ class NASA(Database, NASAClient, commands.Cog):
             embed.set_image(url=data['thumbnail_url'])
         elif 'hdurl' in data:
             embed.set_image(url=data['hdurl'])
-
-        view = ExplanationView(data['explanation'], ctx.author)
-
-        await ctx.send(embed=embed, view=view)
+        return embed
 
     @commands.hybrid_command(
         name='mars',
@@ -5,7 +5,8 @@ extensions = (
     'tree_sync',
     'backup',
     'errors',
-    'help'
+    'help',
+    'diagnostics'
 )
 
 
@@ -14,7 +14,7 @@ class Backup(commands.Cog):
     databases = (
         './cogs/customcommands/command_storage.json',
         './cogs/democracy/democracy.db',
-        './cogs/info/embed_storage.json',
+        './cogs/info/embeds.db',
         './cogs/nasa/channels.db',
         './cogs/share/share.db'
     )
@@ -49,7 +49,12 @@ class Backup(commands.Cog):
     async def get_data(self) -> list[dict[str, str | bytes]]:
         backup_data = []
 
+        # fold the WAL back into the database files so the backups aren't missing recent writes
+        await self.bot.storage.checkpoint()
+
         for filename in self.databases:
+            if filename.endswith('.json'):
+                filename = self.bot.checkpoints.path(filename)
             async with aiofiles.open(filename, 'rb') as file:
                 binary = await file.read()
 
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import io
+from typing import TYPE_CHECKING, Optional
+
+import discord
+from discord.ext import commands
+
+import profiler
+from memory import AllocationTracker, container_sizes
+from utils import deep_sizeof, ManagedView
+
+if TYPE_CHECKING:
+    from bot import BookShelf
+
+
+class Diagnostics(commands.Cog):
+    def __init__(self, bot: BookShelf):
+        self.bot = bot
+        self.profile_lock = asyncio.Lock()
+        self.allocations = AllocationTracker()
+
+    async def cog_check(self, ctx: commands.Context) -> bool:
+        if not await self.bot.is_owner(ctx.author):
+            raise commands.NotOwner()
+        return True
+
+    async def cog_unload(self) -> None:
+        if self.allocations.tracing:
+            self.allocations.stop()
+
+    @commands.command(
+        name='startup',
+        description='See how long each extension took to load.'
+    )
+    async def message_startup(self, ctx: commands.Context):
+        embed = discord.Embed(
+            title='Startup',
+            color=discord.Color.blurple()
+        )
+
+        if self.bot.setup_time is not None:
+            embed.add_field(name='Setup Hook', value=f'{self.bot.setup_time * 1000:.0f} MS')
+        if self.bot.time_to_ready is not None:
+            embed.add_field(name='Time To Ready', value=f'{self.bot.time_to_ready * 1000:.0f} MS')
+        embed.add_field(name='Deferred', value=', '.join(self.bot.pending_extensions) or 'None', inline=False)
+
+        timings = sorted(self.bot.extension_timings.values(), key=lambda t: t.total_time, reverse=True)
+        lines = [f'`{timing.name}`{" (lazy)" if timing.lazy else ""}: {timing}' for timing in timings]
+        embed.description = '\n'.join(lines) or 'No extensions loaded.'
+
+        await ctx.send(embed=embed)
+
+    @commands.command(
+        name='stats',
+        description='See latency and usage of the most used commands.'
+    )
+    async def message_stats(self, ctx: commands.Context, limit: int = 15):
+        metrics = sorted(self.bot.metrics.commands.values(), key=lambda m: m.invocations, reverse=True)[:limit]
+        if not metrics:
+            await ctx.send('No commands have been used yet.')
+            return
+
+        rows = [('command', 'type', 'calls', 'errors', 'active', 'p50', 'p95', 'p99')]
+        for command in metrics:
+            rows.append((
+                command.name,
+                command.kind,
+                str(command.invocations),
+                str(command.errors),
+                str(command.in_flight),
+                *(f'{command.latency.percentile(q) * 1000:.0f}ms' for q in (0.5, 0.95, 0.99))
+            ))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        table = '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
+
+        lag = self.bot.loop_monitor.stats()
+        footer = f'loop lag p50 {lag["p50"] * 1000:.1f}ms, p99 {lag["p99"] * 1000:.1f}ms, ' \
+                 f'max {lag["max"] * 1000:.1f}ms, {lag["slow_callbacks"]:.0f} slow callbacks'
+        outbound = self.bot.outbound.stats()
+        footer += f'\noutbound {outbound["queued"]:.0f} queued over {outbound["routes"]:.0f} routes, ' \
+                  f'{outbound["sent"]:.0f} sent, {outbound["failed"]:.0f} failed, {outbound["retries"]:.0f} retries, ' \
+                  f'delivery p50 {outbound["p50"] * 1000:.0f}ms, p99 {outbound["p99"] * 1000:.0f}ms'
+        footer += f'\nviews {len(ManagedView.live)}/{ManagedView.max_live} live, {ManagedView.evicted} evicted, ' \
+                  f'{len(self.bot.persistent_views)} persistent'
+
+        await ctx.send(f'```\n{table[:1800]}\n\n{footer}\n```')
+
+    @commands.command(
+        name='shards',
+        description='See the latency and guild count of each shard in this process.'
+    )
+    async def message_shards(self, ctx: commands.Context):
+        guild_counts = collections.Counter(guild.shard_id for guild in self.bot.guilds)
+
+        shards: dict[int, discord.ShardInfo] = getattr(self.bot, 'shards', {})
+        if shards:
+            latencies = {shard_id: shard.latency for shard_id, shard in shards.items()}
+        else:
+            latencies = {self.bot.shard_id or 0: self.bot.latency}
+
+        embed = discord.Embed(
+            title='Shards',
+            description=f'{len(latencies)} of {self.bot.shard_count or 1} shards run in this process.',
+            color=discord.Color.blurple()
+        )
+        for shard_id, latency in sorted(latencies.items()):
+            embed.add_field(
+                name=f'Shard {shard_id}',
+                value=f'{latency * 1000:.0f} MS\n{guild_counts[shard_id]} guilds'
+            )
+
+        await ctx.send(embed=embed)
+
+    @commands.command(
+        name='members',
+        description='See how much memory the member cache takes in each guild.'
+    )
+    async def message_members(self, ctx: commands.Context, limit: int = 10):
+        # the guild and connection state are referenced by every member but aren't part of the cache
+        exclude = (self.bot, self.bot._connection, *self.bot.guilds)
+        # walked on the loop, the gateway would be mutating the cache under a thread
+        sizes = {guild: deep_sizeof(guild._members, exclude=exclude) for guild in self.bot.guilds}
+
+        flags = self.bot._connection.member_cache_flags
+        embed = discord.Embed(
+            title='Member Cache',
+            description=f'Mode: {"lean" if self.bot.lean else "full"}, cache flags: '
+                        f'{", ".join(name for name, value in flags if value) or "none"}\n'
+                        f'Total: {sum(sizes.values()) / 1024:.1f} KiB for '
+                        f'{sum(len(guild.members) for guild in sizes)} members',
+            color=discord.Color.blurple()
+        )
+
+        for guild, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            embed.add_field(
+                name=guild.name,
+                value=f'{size / 1024:.1f} KiB\n{len(guild.members)}/{guild.member_count} cached'
+                      f'{"" if guild.chunked else " (not chunked)"}'
+            )
+
+        await ctx.send(embed=embed)
+
+    @commands.command(
+        name='profile',
+        description='Sample what the event loop is doing for some seconds.'
+    )
+    async def message_profile(self, ctx: commands.Context, seconds: commands.Range[int, 1, 120] = 10, limit: int = 15):
+        if self.profile_lock.locked():
+            await ctx.send('A profile is already running.')
+            return
+
+        async with self.profile_lock:
+            await ctx.send(f'Profiling for {seconds} seconds...')
+            result = await profiler.profile(seconds)
+
+        if not result.samples:
+            await ctx.send('No samples were taken.')
+            return
+
+        rows = [('self', 'total', 'function')]
+        for name, own, total in result.top(limit):
+            rows.append((
+                f'{own / result.samples:.1%}',
+                f'{total / result.samples:.1%}',
+                name
+            ))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(2)]
+        table = '\n'.join(
+            '  '.join([*(cell.rjust(width) for cell, width in zip(row, widths)), row[2]]) for row in rows
+        )
+        footer = f'{result.samples} samples over {result.duration:.1f}s, ' \
+                 f'{result.task_samples} task snapshots of {sum(result.task_stacks.values())} suspended tasks'
+
+        file = discord.File(
+            io.BytesIO(result.collapsed().encode()),
+            filename=f'profile-{discord.utils.utcnow():%Y%m%d-%H%M%S}.collapsed'
+        )
+        await ctx.send(f'```\n{table[:1800]}\n\n{footer}\n```', file=file)
+
+    @commands.group(
+        name='memory',
+        description='See how much memory the state each cog keeps takes.',
+        invoke_without_command=True
+    )
+    async def message_memory(self, ctx: commands.Context):
+        exclude = (self.bot, self.bot._connection, *self.bot.guilds)
+        sizes = container_sizes(dict(self.bot.cogs), exclude=exclude)
+        if not sizes:
+            await ctx.send('No cogs have registered state.')
+            return
+
+        rows = [('container', 'items', 'size')]
+        for container in sorted(sizes, key=lambda c: c.size, reverse=True):
+            rows.append((
+                f'{container.owner}.{container.name}',
+                '-' if container.length is None else str(container.length),
+                f'{container.size / 1024:.1f} KiB'
+            ))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        table = '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
+        footer = f'total {sum(c.size for c in sizes) / 1024:.1f} KiB'
+        if self.allocations.tracing:
+            traced = self.allocations.stats()
+            footer += f'\ntracemalloc {traced["current"] / 1024 ** 2:.1f} MiB traced, ' \
+                      f'peak {traced["peak"] / 1024 ** 2:.1f} MiB, {traced["overhead"] / 1024 ** 2:.1f} MiB overhead'
+
+        await ctx.send(f'```\n{table[:1800]}\n\n{footer}\n```')
+
+    @message_memory.command(
+        name='start',
+        description='Start tracing allocations, this slows everything down.'
+    )
+    async def message_memory_start(self, ctx: commands.Context, frames: commands.Range[int, 1, 25] = 1):
+        if self.allocations.tracing:
+            await ctx.send('Allocations are already being traced.')
+            return
+
+        self.allocations.start(frames)
+        snapshot = await asyncio.to_thread(self.allocations.take)
+        await ctx.send(f'Tracing allocations with {frames} frames, took snapshot #{snapshot}.')
+
+    @message_memory.command(
+        name='stop',
+        description='Stop tracing allocations and drop the snapshots.'
+    )
+    async def message_memory_stop(self, ctx: commands.Context):
+        if not self.allocations.tracing:
+            await ctx.send('Allocations aren\'t being traced.')
+            return
+
+        self.allocations.stop()
+        await ctx.send('Stopped tracing allocations.')
+
+    @message_memory.command(
+        name='snapshot',
+        description='Take a snapshot of traced allocations.'
+    )
+    async def message_memory_snapshot(self, ctx: commands.Context):
+        if not self.allocations.tracing:
+            await ctx.send(f'Start tracing first with `{ctx.clean_prefix}memory start`.')
+            return
+
+        snapshot = await asyncio.to_thread(self.allocations.take)
+        await ctx.send(f'Took snapshot #{snapshot}, kept: {", ".join(map(str, self.allocations.snapshots))}.')
+
+    @message_memory.command(
+        name='diff',
+        description='See which lines allocated the most between two snapshots.'
+    )
+    async def message_memory_diff(
+            self,
+            ctx: commands.Context,
+            old: Optional[int] = None,
+            new: Optional[int] = None,
+            limit: commands.Range[int, 1, 25] = 10
+    ):
+        kept = list(self.allocations.snapshots)
+        if len(kept) < 2:
+            await ctx.send('At least two snapshots are needed.')
+            return
+
+        old = kept[-2] if old is None else old
+        new = kept[-1] if new is None else new
+        if old not in self.allocations.snapshots or new not in self.allocations.snapshots:
+            await ctx.send(f'Snapshots kept: {", ".join(map(str, kept))}.')
+            return
+
+        sites = await asyncio.to_thread(self.allocations.diff, old, new, limit=limit)
+        lines = [f'#{old} -> #{new}']
+        for site in sites:
+            lines.append(
+                f'{site.size_diff / 1024:+.1f} KiB ({site.count_diff:+} blocks, {site.size / 1024:.1f} KiB) '
+                f'{site.location}\n    {site.line}'
+            )
+
+        text = '\n'.join(lines)
+        await ctx.send(f'```\n{text[:1900]}\n```')
+
+
+async def setup(bot: BookShelf) -> None:
+    await bot.add_cog(Diagnostics(bot))
@@ -6,7 +6,7 @@ import discord
 from discord.ext import commands
 from requests.structures import CaseInsensitiveDict
 
-from utils import split_embeds
+from utils import EmbedPaginator, split_embeds
 from cogs.customcommands import CustomCommand  # type: ignore
 
 if TYPE_CHECKING:
@@ -14,6 +14,11 @@ if TYPE_CHECKING:
 
 
 class HelpCommand(commands.HelpCommand):
+    async def prepare_help_command(self, ctx: commands.Context, command: Optional[str] = None) -> None:
+        # help needs the real commands, not the stubs of lazily loaded extensions
+        await ctx.bot.load_lazy_extensions()
+        await super().prepare_help_command(ctx, command)
+
     async def send(
             self,
             embed: Optional[discord.Embed] = None,
@@ -31,18 +36,11 @@ class HelpCommand(commands.HelpCommand):
         await split_embeds(embeds, channel)
 
     async def send_bot_help(self, mapping: dict) -> None:
-        embeds = []
-
-        for cog, cmds in mapping.items():
-            embed = None
-
-            if cog and cmds:
-                embed = await self.get_cog_embed(cog)
-
-            if embed:
-                embeds.append(embed)
-
-        await self.send(embeds=embeds, channel=self.context.author)
+        # each message goes out as soon as it's full instead of after every cog is checked
+        async with EmbedPaginator(self.context.author) as paginator:
+            for cog, cmds in mapping.items():
+                if cog and cmds:
+                    await paginator.add(await self.get_cog_embed(cog))
 
     def get_command_embed(self, command: commands.Command) -> discord.Embed:
         embed = discord.Embed(
@@ -173,6 +171,7 @@ class Help(commands.Cog):
         aliases=['cog', 'cogs']
     )
     async def message_category(self, ctx: commands.Context, category: str):
+        await self.bot.load_lazy_extensions()
         cog = CaseInsensitiveDict(self.bot.cogs).get(category)
 
         if not cog:
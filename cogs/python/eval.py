@@ -18,6 +18,8 @@ code_block_converter = commands.parameter(converter=CodeblockConverter, displaye
 
 
 class AstevalEval:
+    state_attributes: tuple[str, ...] = ('interpreters',)
+
     def __init__(self):
         self.interpreters: dict[int, asteval.Interpreter] = {}
 
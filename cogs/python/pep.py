@@ -15,14 +15,15 @@ class PEPs:
     bot: BookShelf
 
     URL: ClassVar[str] = 'https://peps.python.org/api/peps.json'
+    TTL: ClassVar[float] = 24 * 60 * 60
     peps: dict[str, dict] = {}
     all_names: dict[str, str]
 
     async def cog_load(self):
         cls = self.__class__
 
-        async with self.bot.session.get(self.URL) as resp:
-            cls.peps = await resp.json()
+        resp = await self.bot.http_cache.get(self.URL, ttl=self.TTL)
+        cls.peps = resp.json()
         cls.all_names = {
             f'{k} - {v["title"]}': k for k, v in self.__class__.peps.items()
         }
@@ -13,7 +13,7 @@ from fuzzywuzzy import fuzz  # type: ignore
 from .eval import AstevalEval, code_block_converter
 from .pep import PEPs
 from .views import CodeModal
-from utils import get_max
+from utils import top_k
 
 if TYPE_CHECKING:
     from bot import BookShelf
@@ -97,17 +97,11 @@ class Python(AstevalEval, PEPs, commands.Cog):
     @hybrid_pep.autocomplete('pep')
     async def pep_pep_autocomplete(self, interaction: discord.Interaction, current: str):
         current = current.lower()
-        highest: dict[app_commands.Choice[str], int] = {}
-        names: list[app_commands.Choice[str]] = []
-        for name, key in self.all_names.items():
-            name = name.lower()
-            highest[app_commands.Choice(
-                name=name.capitalize(), value=key
-            )] = fuzz.token_sort_ratio(current, name)
-
-        for _ in range(10):
-            option = get_max(highest)
-            names.append(option)
-            del highest[option]
+        # only the winners are turned into choices
+        scores = ((name, fuzz.token_sort_ratio(current, name.lower())) for name in self.all_names)
+        names = [
+            app_commands.Choice(name=name.lower().capitalize(), value=self.all_names[name])
+            for name, _ in top_k(scores, 10)
+        ]
 
         return names
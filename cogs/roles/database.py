@@ -1,52 +1,47 @@
-import json
-from typing import Optional
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
 
-import aiofiles
 import aiosqlite
 import discord
 
+if TYPE_CHECKING:
+    from bot import BookShelf
+    from storage import Database
+
+
+MISSING = discord.utils.MISSING
+
 
 class RolesDatabase:
+    bot: BookShelf
+
     def __init__(self):
-        self.db = aiosqlite.connect('./cogs/roles/database.db')
+        self.db: Database = MISSING
         self.messages: list[int] = []
 
     async def from_file(self) -> None:
-        async with aiofiles.open('./cogs/roles/messages.json', 'r') as file:
-            raw = await file.read()
-
-        try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            async with aiofiles.open('./cogs/roles/messages.json', 'w') as file:
-                await file.write('[]')
-                return await self.from_file()
-
-        self.messages = data
+        self.messages = await self.bot.checkpoints.load('./cogs/roles/messages.json', [])
 
-    async def to_file(self) -> None:
-        dumped = json.dumps(self.messages)
-
-        async with aiofiles.open('./cogs/roles/messages.json', 'w') as file:
-            await file.write(dumped)
+    def snapshot(self) -> list[int]:
+        return list(self.messages)
 
     async def cog_load(self) -> None:
         await self.from_file()
-
-        await self.db
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                '''
-                CREATE TABLE IF NOT EXISTS "authors" (
-                        message_id INT PRIMARY KEY,
-                        author_id INT
-                );
-                '''
-            )
-        await self.db.commit()
+        self.bot.checkpoints.register('roles', './cogs/roles/messages.json', self.snapshot)
+
+        self.db = await self.bot.storage.open('./cogs/roles/database.db')
+        await self.db.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS "authors" (
+                    message_id INT PRIMARY KEY,
+                    author_id INT
+            );
+            '''
+        )
 
     async def cog_unload(self) -> None:
-        await self.to_file()
+        await self.bot.checkpoints.unregister('roles')
         await self.db.close()
 
     async def insert(
@@ -58,8 +53,8 @@ class RolesDatabase:
             message: discord.Message,
             updating: bool = False
     ) -> None:
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
+        async def write(conn: aiosqlite.Connection) -> None:
+            await conn.execute(
                 f'''
                 CREATE TABLE "{message.id}" (
                         role TEXT PRIMARY KEY,
@@ -69,49 +64,46 @@ class RolesDatabase:
                 '''
             )
 
-            for role, description, emoji in zip(roles, descriptions, emojis):
-                await cursor.execute(
-                    f'''
-                    INSERT INTO "{message.id}" VALUES (?, ?, ?);
-                    ''',
+            await conn.executemany(
+                f'''
+                INSERT INTO "{message.id}" VALUES (?, ?, ?);
+                ''',
+                [
                     (role, description or '', str(emoji.id or emoji.name if emoji else emoji))
-                )
+                    for role, description, emoji in zip(roles, descriptions, emojis)
+                ]
+            )
 
             if not updating:
-                await cursor.execute(
+                await conn.execute(
                     '''
                     INSERT INTO "authors" VALUES (?, ?);
                     ''',
                     (message.id, author.id)
                 )
-        await self.db.commit()
+
+        await self.db.write(write)
 
     async def delete(self, message: discord.Message) -> None:
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                f'''
-                DROP TABLE "{message.id}";
-                '''
-            )
-        await self.db.commit()
+        await self.db.execute(
+            f'''
+            DROP TABLE "{message.id}";
+            '''
+        )
 
     async def get_roles(self, message: discord.Message) -> list[tuple[str, str, str]]:
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                f'''
-                SELECT * FROM "{message.id}";
-                '''
-            )
-            return await cursor.fetchall()
+        return await self.db.fetchall(
+            f'''
+            SELECT * FROM "{message.id}";
+            '''
+        )
 
     async def get_author(self, message: discord.Message) -> int:
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                '''
-                SELECT author_id FROM "authors"
-                WHERE message_id = ?;
-                ''',
-                (message.id,)
-            )
-            data = await cursor.fetchone()
-            return data[0]
+        data = await self.db.fetchone(
+            '''
+            SELECT author_id FROM "authors"
+            WHERE message_id = ?;
+            ''',
+            (message.id,)
+        )
+        return data[0]
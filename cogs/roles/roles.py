@@ -6,7 +6,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from utils import InteractionCreator, VirtualContext
+from utils import InteractionCreator
 from .database import RolesDatabase
 from .views import EmbedBuilderModal, RoleOptionView, RoleView, RoleEditView
 
@@ -18,9 +18,18 @@ class Roles(RolesDatabase, commands.Cog, description='Do some cool stuff with ro
     """Do some cool stuff with roles in your server."""
     def __init__(self, bot: BookShelf):
         self.bot = bot
-        self.active_message_ids: list[int] = []
+        self.role_view = RoleView()
         super().__init__()
 
+    async def cog_load(self) -> None:
+        await super().cog_load()
+        # a single persistent view answers every role menu, including ones sent before a restart
+        self.bot.add_view(self.role_view)
+
+    async def cog_unload(self) -> None:
+        self.role_view.stop()
+        await super().cog_unload()
+
     @commands.hybrid_group(
         name='role',
         description='Role related commands.'
@@ -44,6 +53,9 @@ class Roles(RolesDatabase, commands.Cog, description='Do some cool stuff with ro
             view = InteractionCreator(ctx.author, timeout=None)
             await ctx.send(view=view)
             await view.wait()
+            if not view.clicked:
+                await ctx.send('This button expired, run the command again.')
+                return
             interaction = view.interaction
 
         await interaction.response.send_modal(modal)
@@ -64,7 +76,8 @@ class Roles(RolesDatabase, commands.Cog, description='Do some cool stuff with ro
         view = RoleOptionView()
         await modal.interaction.response.send_message(view=view, embed=view.embed)
         view.message = await modal.interaction.original_response()
-        await view.wait()
+        if await view.wait():
+            return
 
         if not view.options:
             return
@@ -74,7 +87,7 @@ class Roles(RolesDatabase, commands.Cog, description='Do some cool stuff with ro
         emojis = [option.emoji for option in view.options]
         author = interaction.user
 
-        view = RoleView(view.options)
+        view = RoleView.for_message(view.options)
 
         try:
             message = await channel.send(embed=embed, view=view)
@@ -93,8 +106,8 @@ class Roles(RolesDatabase, commands.Cog, description='Do some cool stuff with ro
             embed=embed
         )
 
-        self.active_message_ids.append(message.id)
         self.messages.append(message.id)
+        self.bot.checkpoints.mark_dirty('roles')
         await self.insert(roles, descriptions, emojis, author, message)
 
     @hybrid_role.command(
@@ -113,7 +126,8 @@ class Roles(RolesDatabase, commands.Cog, description='Do some cool stuff with ro
         options = message.components[0].children[0].options
         view = RoleEditView(options)
         await ctx.send(embed=embed, view=view)
-        await view.wait()
+        if await view.wait():
+            return
 
         embed = view.embed
         options = view.select.options
@@ -125,47 +139,9 @@ class Roles(RolesDatabase, commands.Cog, description='Do some cool stuff with ro
         await self.delete(message)
         await self.insert(roles, descriptions, emojis, ctx.author, message, updating=True)
 
-        view = RoleView(options)
-        await message.edit(embed=embed, view=view)
+        await message.edit(embed=embed, view=RoleView.for_message(options))
 
     # listeners
-    @commands.Cog.listener()
-    async def on_interaction(self, interaction: discord.Interaction):
-        if not interaction.message or interaction.message.id not in self.messages:
-            return
-
-        await interaction.response.defer()
-
-        if interaction.message.id in self.active_message_ids:
-            return
-
-        options: list[discord.SelectOption] = []
-        for role_id, description, emoji in await self.get_roles(interaction.message):
-            role = interaction.guild.get_role(int(role_id))
-
-            if emoji == 'None':
-                emoji = None
-            else:
-                ctx = VirtualContext(guild=interaction.guild, bot=interaction.client)
-                try:
-                    emoji = await commands.EmojiConverter().convert(ctx, emoji)  # type: ignore
-                except commands.EmojiConverter:
-                    pass
-
-            option = discord.SelectOption(
-                label=role.name,
-                emoji=emoji,
-                description=description,
-                value=str(role.id)
-            )
-            options.append(option)
-
-        view = RoleView(options)
-        self.bot.add_view(view, message_id=interaction.message.id)
-        self.active_message_ids.append(interaction.message.id)
-
-        await view.children[0].callback(interaction)
-
     @commands.Cog.listener()
     async def on_message_delete(self, message: discord.Message):
         if message.id in self.messages:
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-import asyncio
+from typing import Sequence
 
 import discord
 from discord.ext import commands
 
-from utils import VirtualContext
+from utils import ManagedView, VirtualContext
 
 
 MISSING = discord.utils.MISSING
@@ -107,7 +107,7 @@ class RoleOptionModal(discord.ui.Modal, title='Create a role option'):
         await self.view.message.edit(embed=self.view.embed)
 
 
-class RoleOptionView(discord.ui.View):
+class RoleOptionView(ManagedView):
     def __init__(self):
         super().__init__(timeout=None)
         self.embed = discord.Embed(
@@ -142,27 +142,41 @@ class RoleOptionView(discord.ui.View):
 
 
 class RoleSelect(discord.ui.Select['RoleView']):
-    def __init__(self, options: list[discord.SelectOption]):
+    def __init__(self, options: Sequence[discord.SelectOption] = ()):
         super().__init__(
-            options=options,
+            options=list(options),
             min_values=0,
-            max_values=len(options),
+            max_values=max(len(options), 1),
             placeholder='Select your roles!',
             custom_id=f'{type(self).__name__}'
         )
 
+    @staticmethod
+    def message_options(message: discord.Message) -> list[discord.SelectOption]:
+        for row in message.components:
+            for component in getattr(row, 'children', ()):
+                if getattr(component, 'custom_id', None) == RoleSelect.__name__:
+                    return component.options  # type: ignore
+        return []
+
     async def callback(self, interaction: discord.Interaction) -> None:
-        selected = {interaction.guild.get_role(int(value)) for value in self.values}
+        # one instance serves every menu, so the options come from the message that was used
+        values: list[str] = interaction.data.get('values', [])  # type: ignore
+        options = self.message_options(interaction.message)
+
+        selected = {interaction.guild.get_role(int(value)) for value in values}
         unselected = {
             interaction.guild.get_role(int(option.value))
-            for option in self.options if option.value not in self.values
+            for option in options if option.value not in values
         }
+        selected.discard(None)
+        unselected.discard(None)
         user_roles = set(interaction.user.roles)
 
         adding = selected - user_roles
         removing = unselected & user_roles
 
-        await asyncio.sleep(0)
+        await interaction.response.defer()
 
         try:
             if adding:
@@ -193,11 +207,23 @@ class RoleSelect(discord.ui.Select['RoleView']):
 
 
 class RoleView(discord.ui.View):
-    def __init__(self, options: list[discord.SelectOption]):
+    """Registered once without options as the persistent view for every role menu.
+
+    Instances made with options are only for sending, they're stopped right
+    away so interactions go to the persistent one.
+    """
+
+    def __init__(self, options: Sequence[discord.SelectOption] = ()):
         super().__init__(timeout=None)
         select = RoleSelect(options)
         self.add_item(select)
 
+    @classmethod
+    def for_message(cls, options: Sequence[discord.SelectOption]) -> RoleView:
+        view = cls(options)
+        view.stop()
+        return view
+
 
 class RoleEditSelect(discord.ui.Select['RoleEditView']):
     def __init__(self, options: list[discord.SelectOption]):
@@ -298,7 +324,7 @@ class RoleOptionEditAddModal(RoleOptionModal):
         await interaction.response.send_message('Role option added.', ephemeral=True)
 
 
-class RoleEditView(discord.ui.View):
+class RoleEditView(ManagedView):
     def __init__(self, options: list[discord.SelectOption]):
         super().__init__(timeout=None)
         self.select = RoleEditSelect(options)
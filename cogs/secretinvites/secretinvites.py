@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import datetime
+import logging
 import random
 from typing import TYPE_CHECKING
 
@@ -10,14 +11,23 @@ from discord import app_commands
 from discord.ext import commands
 
 import checks
-from utils import async_yielder
+from utils import rate_limited
 
 if TYPE_CHECKING:
     from bot import BookShelf
 
 
+_log = logging.getLogger(__name__)
+
+
 class SecretInvites(commands.Cog):
     """Get invites without dumb mods knowing."""
+    state_attributes: tuple[str, ...] = ('cached_invites', 'guild_invites_ready')
+
+    # guild.invites() requests made a second while filling the cache at startup
+    populate_rate: float = 2
+    populate_burst: int = 5
+    populate_concurrency: int = 4
 
     def __init__(self, bot: BookShelf):
         self.bot = bot
@@ -65,23 +75,31 @@ class SecretInvites(commands.Cog):
         except ValueError:
             pass
 
+    async def fetch_invites(self, guild: discord.Guild) -> None:
+        try:
+            if guild.me.guild_permissions.manage_channels:
+                self.cached_invites[guild.id].extend(await guild.invites())
+        except discord.Forbidden:
+            pass
+        finally:
+            self.guild_invites_ready[guild.id].set()
+
     async def populate_cache(self) -> None:
         await self.bot.wait_until_ready()
         self.cached_invites = {guild.id: [] for guild in self.bot.guilds}
         self.guild_invites_ready = {guild.id: asyncio.Event() for guild in self.bot.guilds}
 
-        async for guilds in async_yielder(self.bot.guilds, count=10, delay=10):
-            for guild in guilds:
-                if not guild.me.guild_permissions.manage_channels:
-                    continue
-                try:
-                    invites = await guild.invites()
-                except discord.Forbidden:
-                    pass
-                else:
-                    self.cached_invites[guild.id].extend(invites)
-                finally:
-                    self.guild_invites_ready[guild.id].set()
+        results = rate_limited(
+            self.fetch_invites,
+            list(self.bot.guilds),
+            rate=self.populate_rate,
+            burst=self.populate_burst,
+            concurrency=self.populate_concurrency,
+            progress=lambda progress: _log.debug('Populating invites: %s', progress)
+        )
+        async for guild, error in results:
+            if error is not None:
+                _log.warning('Failed to fetch invites for guild %s', guild.id, exc_info=error)
 
     async def cog_load(self) -> None:
         await super().cog_load()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import hashlib
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+RAW = 0
+ZLIB = 1
+ZSTD = 2
+
+
+def default_codec() -> int:
+    return ZSTD if zstandard is not None else ZLIB
+
+
+def digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def pack(text: str, *, threshold: int = 512, codec: Optional[int] = None) -> tuple[int, bytes]:
+    raw = text.encode()
+    if len(raw) < threshold:
+        return RAW, raw
+
+    if codec is None:
+        codec = default_codec()
+    if codec == ZSTD:
+        data = zstandard.ZstdCompressor(level=10).compress(raw)
+    else:
+        codec = ZLIB
+        data = zlib.compress(raw, 9)
+
+    # not worth it for text that doesn't compress
+    if len(data) >= len(raw):
+        return RAW, raw
+    return codec, data
+
+
+def unpack(codec: int, data: bytes) -> str:
+    if codec == ZLIB:
+        data = zlib.decompress(data)
+    elif codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstandard has to be installed to read zstd compressed stories')
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data.decode()
+
+
+def unpack_body(codec: Optional[int], data: Optional[bytes]) -> Optional[str]:
+    # stories without a body come out of the LEFT JOIN as NULLs
+    if data is None:
+        return None
+    return unpack(codec, data)  # type: ignore
@@ -1,47 +1,551 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
 import aiosqlite
 import discord
-from typing import Iterable
+
+from utils import BatchProgress
+from . import bodies
+
+if TYPE_CHECKING:
+    from bot import BookShelf
+    from storage import Database
+
+
+MISSING = discord.utils.MISSING
+
+
+_log = logging.getLogger(__name__)
+
+
+_WORD = re.compile(r'\w+')
+
+
+def snippet(text: str, words: Iterable[str], *, tokens: int = 16, mark: str = '**', ellipsis: str = '...') -> str:
+    """A window of ``tokens`` words around the first match, like FTS5's ``snippet``.
+
+    The index doesn't keep the texts, so this runs on the unpacked one. A
+    prefix match either way stands in for the porter stemmer, ``dragon``
+    marks ``dragons`` and ``knights`` marks ``knight``.
+    """
+
+    words = [word.lower() for word in words]
+
+    def matches(token: str) -> bool:
+        token = token.lower()
+        return any(token.startswith(word) or (word.startswith(token) and len(token) >= len(word) - 2) for word in words)
+
+    found = list(_WORD.finditer(text))
+    if not found:
+        return text[:tokens * 8]
+
+    first = next((index for index, match in enumerate(found) if matches(match.group())), 0)
+    start = max(min(first - tokens // 4, len(found) - tokens), 0)
+    end = min(start + tokens, len(found))
+
+    parts = [ellipsis] if start else []
+    position = found[start].start()
+    for match in found[start:end]:
+        parts.append(text[position:match.start()])
+        parts.append(f'{mark}{match.group()}{mark}' if matches(match.group()) else match.group())
+        position = match.end()
+    if end < len(found):
+        parts.append(ellipsis)
+    else:
+        parts.append(text[position:])
+    return ''.join(parts)
 
 
 class ShareDatabase:
+    bot: BookShelf
+
+    # rows copied per write transaction and the pause between them while migrating
+    migration_batch: int = 200
+    migration_pause: float = 0.05
+    # texts shorter than this many bytes aren't worth compressing
+    compress_threshold: int = 512
+    # bm25 weights of the name and text columns
+    search_weights: tuple[float, float] = (5.0, 1.0)
+
     def __init__(self):
-        self.db: aiosqlite.Connection = aiosqlite.connect('./cogs/share/share.db')
+        self.db: Database = MISSING
+        # authors that still have a table of their own from before the stories table
+        self.legacy_authors: set[int] = set()
+        self.migration: Optional[BatchProgress] = None
+        self.migration_lock = asyncio.Lock()
 
     async def cog_load(self) -> None:
-        await self.db
+        self.db = await self.bot.storage.open('./cogs/share/share.db')
+        legacy = await self.bot.checkpoints.load('./cogs/share/read_count.json', {})
+
+        async def create(conn: aiosqlite.Connection) -> None:
+            await conn.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS stories (
+                            author_id INTEGER NOT NULL,
+                            name TEXT NOT NULL,
+                            text TEXT,
+                            created_at REAL,
+                            body_id INTEGER,
+                            PRIMARY KEY (author_id, name)
+                );
+                '''
+            )
+            async with conn.execute('PRAGMA table_info(stories);') as cursor:
+                columns = {row[1] for row in await cursor.fetchall()}
+            if 'body_id' not in columns:
+                await conn.execute('ALTER TABLE stories ADD COLUMN body_id INTEGER;')
+
+            await conn.execute(
+                '''
+                CREATE INDEX IF NOT EXISTS stories_author_created_at ON stories (author_id, created_at);
+                '''
+            )
+            await conn.execute(
+                '''
+                CREATE INDEX IF NOT EXISTS stories_created_at ON stories (created_at);
+                '''
+            )
+
+            # story texts are stored once per content hash, compressed past compress_threshold bytes
+            await conn.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS bodies (
+                            id INTEGER PRIMARY KEY,
+                            hash BLOB NOT NULL UNIQUE,
+                            codec INTEGER NOT NULL,
+                            data BLOB NOT NULL,
+                            size INTEGER NOT NULL
+                );
+                '''
+            )
+            async with conn.execute('SELECT sql FROM sqlite_master WHERE name = \'stories_fts\';') as cursor:
+                row = await cursor.fetchone()
+            indexed = row is not None and "content=''" in row[0]
+            if row is not None and not indexed:
+                # older indexes either read the texts through unpack_body, which only this process has, or
+                # kept an uncompressed copy of every one of them
+                for trigger in ('stories_fts_insert', 'stories_fts_delete', 'stories_fts_update'):
+                    await conn.execute(f'DROP TRIGGER IF EXISTS {trigger};')
+                await conn.execute('DROP TABLE stories_fts;')
+            await conn.execute('DROP VIEW IF EXISTS story_texts;')
+
+            # contentless, the index only stores tokens and snippets are cut from the unpacked texts
+            await conn.execute(
+                '''
+                CREATE VIRTUAL TABLE IF NOT EXISTS stories_fts USING fts5(
+                            name,
+                            text,
+                            content='',
+                            tokenize='porter unicode61'
+                );
+                '''
+            )
+            # a contentless index needs the original text to forget a row, sqlite only has it for stories with
+            # their text inline, ones with a body are indexed by whoever packed it, see index_story.
+            # moving a text into bodies leaves it the same, so that doesn't touch the index
+            await conn.execute(
+                '''
+                CREATE TRIGGER IF NOT EXISTS stories_fts_insert AFTER INSERT ON stories
+                WHEN new.text IS NOT NULL BEGIN
+                    INSERT INTO stories_fts (rowid, name, text) VALUES (new.rowid, new.name, new.text);
+                END;
+                '''
+            )
+            await conn.execute(
+                '''
+                CREATE TRIGGER IF NOT EXISTS stories_fts_delete AFTER DELETE ON stories
+                WHEN old.text IS NOT NULL BEGIN
+                    INSERT INTO stories_fts (stories_fts, rowid, name, text)
+                    VALUES ('delete', old.rowid, old.name, old.text);
+                END;
+                '''
+            )
+            await conn.execute(
+                '''
+                CREATE TRIGGER IF NOT EXISTS stories_fts_update AFTER UPDATE OF name, text ON stories
+                WHEN old.text IS NOT NULL AND new.text IS NOT NULL BEGIN
+                    INSERT INTO stories_fts (stories_fts, rowid, name, text)
+                    VALUES ('delete', old.rowid, old.name, old.text);
+                    INSERT INTO stories_fts (rowid, name, text) VALUES (new.rowid, new.name, new.text);
+                END;
+                '''
+            )
+
+            if not indexed:
+                await self.rebuild_index(conn)
+
+            await conn.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS reads (
+                            guild_id INTEGER NOT NULL,
+                            author_id INTEGER NOT NULL,
+                            count INTEGER NOT NULL,
+                            PRIMARY KEY (guild_id, author_id)
+                ) WITHOUT ROWID;
+                '''
+            )
+
+            # every cluster reads the same authors, so their names are kept here rather than in a checkpoint
+            await conn.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS author_names (
+                            author_id INTEGER PRIMARY KEY,
+                            name TEXT NOT NULL
+                );
+                '''
+            )
+            async with conn.execute('SELECT 1 FROM author_names LIMIT 1;') as cursor:
+                named = await cursor.fetchone() is not None
+            if not named:
+                # names used to be checkpointed to read_count.json, the first process to get here copies them over
+                await conn.executemany(
+                    '''
+                    INSERT INTO author_names (author_id, name) VALUES (?, ?);
+                    ''',
+                    [(int(author_id), name) for author_id, name in legacy.get('names', {}).items()]
+                )
+
+        await self.db.write(create)
+
+        rows = await self.db.fetchall(
+            '''
+            SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB '[0-9]*';
+            '''
+        )
+        self.legacy_authors = {int(name) for name, in rows if name.isdigit()}
 
     async def cog_unload(self) -> None:
         await self.db.close()
 
-    async def process_write(self, user: discord.abc.User, name: str, text: str) -> str:
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                f'''
-                CREATE TABLE IF NOT EXISTS "{user.id}" (
-                            name TEXT PRIMARY KEY,
-                            text TEXT
-                );
+    @staticmethod
+    async def rebuild_index(conn: aiosqlite.Connection) -> None:
+        await conn.execute('INSERT INTO stories_fts (stories_fts) VALUES (\'delete-all\');')
+
+        last_rowid = 0
+        while True:
+            async with conn.execute(
                 '''
+                SELECT stories.rowid, stories.name, stories.text, bodies.codec, bodies.data
+                FROM stories LEFT JOIN bodies ON bodies.id = stories.body_id
+                WHERE stories.rowid > ? ORDER BY stories.rowid LIMIT 500;
+                ''',
+                (last_rowid,)
+            ) as cursor:
+                rows = list(await cursor.fetchall())
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+
+            await conn.executemany(
+                'INSERT INTO stories_fts (rowid, name, text) VALUES (?, ?, ?);',
+                [
+                    (rowid, name, text if text is not None else bodies.unpack_body(codec, data))
+                    for rowid, name, text, codec, data in rows
+                ]
             )
 
+    @staticmethod
+    async def index_story(conn: aiosqlite.Connection, rowid: int, name: str, text: str) -> None:
+        await conn.execute('INSERT INTO stories_fts (rowid, name, text) VALUES (?, ?, ?);', (rowid, name, text))
+
+    @staticmethod
+    async def insert_body(conn: aiosqlite.Connection, body_hash: bytes, codec: int, data: bytes, size: int) -> int:
+        await conn.execute(
+            '''
+            INSERT INTO bodies (hash, codec, data, size) VALUES (?, ?, ?, ?) ON CONFLICT (hash) DO NOTHING;
+            ''',
+            (body_hash, codec, data, size)
+        )
+        async with conn.execute('SELECT id FROM bodies WHERE hash = ?;', (body_hash,)) as cursor:
+            body_id, = await cursor.fetchone()  # type: ignore
+        return body_id
+
+    def pack_body(self, text: str) -> tuple[bytes, int, bytes, int]:
+        codec, data = bodies.pack(text, threshold=self.compress_threshold)
+        return bodies.digest(text), codec, data, len(text.encode())
+
+    async def process_write(self, user: discord.abc.User, name: str, text: str) -> str:
+        body = self.pack_body(text)
+
+        async def write(conn: aiosqlite.Connection) -> bool:
+            if user.id in self.legacy_authors:
+                async with conn.execute(f'SELECT 1 FROM "{user.id}" WHERE name = ?', (name,)) as cursor:
+                    if await cursor.fetchone() is not None:
+                        return False
+
+            body_id = await self.insert_body(conn, *body)
+            async with conn.execute(
+                '''
+                INSERT INTO stories (author_id, name, created_at, body_id) VALUES (?, ?, ?, ?)
+                ''',
+                (user.id, name, time.time(), body_id)
+            ) as cursor:
+                rowid = cursor.lastrowid
+            await self.index_story(conn, rowid, name, text)  # type: ignore
+            return True
+
+        try:
+            written = await self.db.write(write)
+        except aiosqlite.IntegrityError:
+            written = False
+
+        if not written:
+            return f'You already have a story named "{name}"'
+        return f'Your writing has been saved!'
+
+    async def fetch_story_names(self, author_id: int, after: Optional[str], limit: int) -> list[str]:
+        # keyset pagination, each page starts after the last name of the one before
+        if author_id in self.legacy_authors:
             try:
-                await cursor.execute(
+                rows = await self.db.fetchall(
                     f'''
-                    INSERT INTO "{user.id}" VALUES (?, ?)
+                    SELECT name FROM (
+                        SELECT name FROM stories WHERE author_id = ? UNION SELECT name FROM "{author_id}"
+                    ) WHERE name > ? ORDER BY name LIMIT ?;
                     ''',
-                    (name, text)
+                    (author_id, after or '', limit)
                 )
-            except aiosqlite.IntegrityError:
-                return f'You already have a story named "{name}"'
+            except aiosqlite.OperationalError:
+                # the migration dropped it in the meantime, the rows are in stories now
+                pass
+            else:
+                return [name for name, in rows]
 
-        await self.db.commit()
-        return f'Your writing has been saved!'
+        rows = await self.db.fetchall(
+            '''
+            SELECT name FROM stories WHERE author_id = ? AND name > ? ORDER BY name LIMIT ?;
+            ''',
+            (author_id, after or '', limit)
+        )
+        return [name for name, in rows]
+
+    async def fetch_story(self, author_id: int, name: str) -> Optional[str]:
+        # stories from before bodies, or not recompressed yet, still have their text inline
+        row = await self.db.fetchone(
+            '''
+            SELECT stories.text, bodies.codec, bodies.data
+            FROM stories LEFT JOIN bodies ON bodies.id = stories.body_id
+            WHERE stories.author_id = ? AND stories.name = ?;
+            ''',
+            (author_id, name)
+        )
+        if row is not None:
+            text, codec, data = row
+            return text if text is not None else bodies.unpack_body(codec, data)
+
+        if author_id in self.legacy_authors:
+            try:
+                row = await self.db.fetchone(f'SELECT text FROM "{author_id}" WHERE name = ?;', (name,))
+            except aiosqlite.OperationalError:
+                return await self.fetch_story(author_id, name)
+
+        return row[0] if row is not None else None
+
+    async def fetch_reads(self) -> list[tuple[int, int, int]]:
+        return await self.db.fetchall(
+            '''
+            SELECT guild_id, author_id, count FROM reads;
+            '''
+        )
+
+    async def add_reads(self, reads: Iterable[tuple[int, int, int]]) -> None:
+        await self.db.executemany(
+            '''
+            INSERT INTO reads (guild_id, author_id, count) VALUES (?, ?, ?)
+            ON CONFLICT (guild_id, author_id) DO UPDATE SET count = count + excluded.count;
+            ''',
+            reads
+        )
+
+    async def fetch_author_names(self, author_ids: Iterable[int]) -> dict[int, str]:
+        author_ids = list(author_ids)
+        if not author_ids:
+            return {}
+
+        rows = await self.db.fetchall(
+            f'''
+            SELECT author_id, name FROM author_names
+            WHERE author_id IN ({', '.join('?' * len(author_ids))});
+            ''',
+            author_ids
+        )
+        return dict(rows)
+
+    async def set_author_name(self, author_id: int, name: str) -> None:
+        await self.db.execute(
+            '''
+            INSERT INTO author_names (author_id, name) VALUES (?, ?)
+            ON CONFLICT (author_id) DO UPDATE SET name = excluded.name;
+            ''',
+            (author_id, name)
+        )
+
+    async def search(self, query: str, limit: int = 10) -> list[tuple[int, str, str]]:
+        # every word is quoted so user input can't be read as FTS5 syntax
+        terms = ' '.join('"' + word.replace('"', '""') + '"' for word in query.split())
+        if not terms:
+            return []
 
-    async def fetch_writes(self, user: discord.abc.User) -> Iterable[tuple[str, str]]:
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                f'''
-                SELECT * FROM "{user.id}";
+        rows = await self.db.fetchall(
+            '''
+            SELECT stories.author_id, stories.name, stories.text, bodies.codec, bodies.data
+            FROM stories_fts JOIN stories ON stories.rowid = stories_fts.rowid
+            LEFT JOIN bodies ON bodies.id = stories.body_id
+            WHERE stories_fts MATCH ?
+            ORDER BY bm25(stories_fts, ?, ?)
+            LIMIT ?;
+            ''',
+            (terms, *self.search_weights, limit)
+        )
+
+        words = _WORD.findall(query)
+
+        def snippets() -> list[tuple[int, str, str]]:
+            return [
+                (author_id, name, snippet(text if text is not None else bodies.unpack_body(codec, data), words))
+                for author_id, name, text, codec, data in rows
+            ]
+
+        return await asyncio.to_thread(snippets)
+
+    async def migrate_author(self, author_id: int) -> int:
+        table = f'"{author_id}"'
+        last_rowid = 0
+        copied = 0
+
+        while True:
+            async def copy(conn: aiosqlite.Connection) -> list[tuple[int, str, str]]:
+                async with conn.execute(
+                    f'SELECT rowid, name, text FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?;',
+                    (last_rowid, self.migration_batch)
+                ) as cursor:
+                    rows = list(await cursor.fetchall())
+
+                await conn.executemany(
+                    '''
+                    INSERT OR IGNORE INTO stories (author_id, name, text) VALUES (?, ?, ?)
+                    ''',
+                    [(author_id, name, text) for _, name, text in rows]
+                )
+                return rows
+
+            rows = await self.db.write(copy)
+            copied += len(rows)
+            if len(rows) < self.migration_batch:
+                break
+            last_rowid = rows[-1][0]
+            await asyncio.sleep(self.migration_pause)
+
+        # reads stop looking at the table before it's dropped
+        self.legacy_authors.discard(author_id)
+        await self.db.execute(f'DROP TABLE IF EXISTS {table};')
+        return copied
+
+    async def migrate(self, progress: Optional[Callable[[BatchProgress], None]] = None) -> BatchProgress:
+        """Copies every per-author table into ``stories`` and drops it.
+
+        Each batch is its own write so reads and new stories go through in
+        between, until an author's table is dropped their stories are read
+        from both places.
+        """
+        async with self.migration_lock:
+            self.migration = BatchProgress(total=len(self.legacy_authors))
+
+            for author_id in sorted(self.legacy_authors):
+                self.migration.started += 1
+                try:
+                    await self.migrate_author(author_id)
+                except aiosqlite.Error:
+                    _log.exception('Failed to migrate the stories of %s', author_id)
+                    self.migration.failed += 1
+                else:
+                    self.migration.done += 1
+
+                if progress is not None:
+                    progress(self.migration)
+
+            return self.migration
+
+    async def stored_size(self) -> int:
+        # the search index is part of what the texts cost
+        row = await self.db.fetchone(
+            '''
+            SELECT (SELECT coalesce(sum(length(CAST(text AS BLOB))), 0) FROM stories)
+                 + (SELECT coalesce(sum(length(data)), 0) FROM bodies)
+                 + (SELECT coalesce(sum(length(block)), 0) FROM stories_fts_data);
+            '''
+        )
+        return row[0]  # type: ignore
+
+    def repack_bodies(self, rows: list[tuple[int, int, bytes]]) -> list[tuple[int, bytes, int]]:
+        repacked = []
+        for body_id, codec, data in rows:
+            new_codec, new_data = bodies.pack(bodies.unpack(codec, data), threshold=self.compress_threshold)
+            if len(new_data) < len(data) or (new_codec != codec and len(new_data) == len(data)):
+                repacked.append((new_codec, new_data, body_id))
+        return repacked
+
+    async def recompress(self) -> tuple[int, int]:
+        """Moves inline story texts into bodies and packs every body again.
+
+        Runs in batches like ``migrate`` and vacuums the file after, returns
+        how many bytes the texts and their search index took before and after.
+        """
+        async with self.migration_lock:
+            before = await self.stored_size()
+
+            while True:
+                rows = await self.db.fetchall(
+                    '''
+                    SELECT rowid, text FROM stories WHERE text IS NOT NULL LIMIT ?;
+                    ''',
+                    (self.migration_batch,)
+                )
+                if not rows:
+                    break
+                packed = await asyncio.to_thread(lambda: [(rowid, self.pack_body(text)) for rowid, text in rows])
+
+                async def move(conn: aiosqlite.Connection) -> None:
+                    for rowid, body in packed:
+                        body_id = await self.insert_body(conn, *body)
+                        await conn.execute(
+                            '''
+                            UPDATE stories SET text = NULL, body_id = ? WHERE rowid = ?;
+                            ''',
+                            (body_id, rowid)
+                        )
+
+                await self.db.write(move)
+                await asyncio.sleep(self.migration_pause)
+
+            last_id = 0
+            while True:
+                rows = await self.db.fetchall(
+                    '''
+                    SELECT id, codec, data FROM bodies WHERE id > ? ORDER BY id LIMIT ?;
+                    ''',
+                    (last_id, self.migration_batch)
+                )
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                repacked = await asyncio.to_thread(self.repack_bodies, rows)
+                if repacked:
+                    await self.db.executemany('UPDATE bodies SET codec = ?, data = ? WHERE id = ?;', repacked)
+                await asyncio.sleep(self.migration_pause)
+
+            await self.db.execute(
+                '''
+                DELETE FROM bodies WHERE id NOT IN (SELECT body_id FROM stories WHERE body_id IS NOT NULL);
                 '''
             )
-            return await cursor.fetchall()
+            # the freed pages only leave the file once it's rebuilt
+            await self.db.vacuum()
+            return before, await self.stored_size()
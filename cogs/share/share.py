@@ -1,17 +1,19 @@
 from __future__ import annotations
 
+import collections
+import functools
+import logging
 from typing import TYPE_CHECKING, Any, TypeVar, Optional, overload
 
-import aiosqlite
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from utils import AuthoredView, InteractionCreator
 
 from .database import ShareDatabase
-from .views import AuthorSelect, WritingModal, WriteSelect
-from utils import get_max
+from .views import AuthorSelect, StoryBrowser, WritingModal
+from utils import RunningTop
 
 if TYPE_CHECKING:
     from bot import BookShelf
@@ -20,13 +22,62 @@ if TYPE_CHECKING:
 MISSING = discord.utils.MISSING
 
 
+_log = logging.getLogger(__name__)
+
+
 class Share(ShareDatabase, commands.Cog):
     """Share your writing with others!"""
+    state_attributes: tuple[str, ...] = ('read_counts', 'pending_reads', 'author_names')
+
+    popular_size: int = 5
+
     def __init__(self, bot: BookShelf):
         self.bot = bot
-        self.read_count: dict[discord.User, int] = {}
+        self.read_counts: dict[int, RunningTop[int]] = {}
+        # reads since the last flush, keyed by (guild_id, author_id)
+        self.pending_reads: collections.Counter[tuple[int, int]] = collections.Counter()
+        # the names last written to the database, so a read only writes one when it changed
+        self.author_names: dict[int, str] = {}
         super().__init__()
 
+    async def cog_load(self) -> None:
+        await super().cog_load()
+
+        counts: dict[int, dict[int, int]] = {}
+        for guild_id, author_id, count in await self.fetch_reads():
+            counts.setdefault(guild_id, {})[author_id] = count
+        self.read_counts = {
+            guild_id: RunningTop(self.popular_size, guild_counts) for guild_id, guild_counts in counts.items()
+        }
+        self.flush_reads.start()
+
+    async def cog_unload(self) -> None:
+        self.flush_reads.cancel()
+        await self.save_reads()
+        await super().cog_unload()
+
+    def count_read(self, guild_id: int, author_id: int) -> None:
+        if guild_id not in self.read_counts:
+            self.read_counts[guild_id] = RunningTop(self.popular_size)
+        self.read_counts[guild_id].increment(author_id)
+        self.pending_reads[(guild_id, author_id)] += 1
+
+    async def save_reads(self) -> None:
+        if not self.pending_reads:
+            return
+
+        pending, self.pending_reads = self.pending_reads, collections.Counter()
+        try:
+            await self.add_reads([(guild_id, author_id, count) for (guild_id, author_id), count in pending.items()])
+        except Exception:
+            _log.exception('Failed to save %s read counts', len(pending))
+            # try again next time with whatever came in since
+            self.pending_reads.update(pending)
+
+    @tasks.loop(seconds=30)
+    async def flush_reads(self) -> None:
+        await self.save_reads()
+
     @commands.command(
         name='write',
         description='Write a story to share!'
@@ -35,6 +86,9 @@ class Share(ShareDatabase, commands.Cog):
         creator = InteractionCreator(author=ctx.author, timeout=None)
         await ctx.send(view=creator)
         await creator.wait()
+        if not creator.clicked:
+            await ctx.send('This button expired, run the command again.')
+            return
 
         await self.app_write.callback(self, creator.interaction)
 
@@ -58,20 +112,21 @@ class Share(ShareDatabase, commands.Cog):
         author='The user to read stories from.'
     )
     async def hybrid_read(self, ctx: commands.Context, author: discord.User):
-        try:
-            writes = await self.fetch_writes(author)
-        except aiosqlite.OperationalError:
+        browser = StoryBrowser(ctx.author, functools.partial(self.fetch_story_names, author.id))
+        if not await browser.start():
             await ctx.send(f'{author} has not written anything.')
             return
 
-        select = WriteSelect(writes)
-        view = AuthoredView(ctx.author)
-        view.add_item(select)
-
-        await ctx.send(view=view)
-        await view.wait()
+        await ctx.send(view=browser)
+        await browser.wait()
+        if browser.value is MISSING:
+            return
 
-        name, text = select.value
+        name = browser.value
+        text = await self.fetch_story(author.id, name)
+        if text is None:
+            await ctx.send(f'{author} doesn\'t have a story named "{name}" anymore.', ephemeral=True)
+            return
 
         ephemeral = False
 
@@ -92,45 +147,96 @@ class Share(ShareDatabase, commands.Cog):
 
         await ctx.send(embeds=embeds, ephemeral=ephemeral)
 
-        self.read_count.setdefault(author, 0)
-        self.read_count[author] += 1
+        if ctx.guild is not None:
+            self.count_read(ctx.guild.id, author.id)
+        if self.author_names.get(author.id) != author.name:
+            await self.set_author_name(author.id, author.name)
+            self.author_names[author.id] = author.name
 
     @commands.hybrid_command(
         name='popular',
         description='Get some popular authors in this server!'
     )
-    @commands.cooldown(1, 60, commands.BucketType.user)
+    @commands.guild_only()
     async def hybrid_popular(self, ctx: commands.Context):
-        copy = self.read_count.copy()
-
-        popular = {k.name: v for k, v in copy.items()}
-        popular_ids = {user.name: user.id for user in copy}
-        popular_authors: list[str] = []
-
-        for _ in range(5):
-            try:
-                author = get_max(popular)
-
-                if not author:
-                    break
-
-                popular_authors.append(
-                    author
-                )
-                del popular[author]
-            except ValueError:
-                break
+        counts = self.read_counts.get(ctx.guild.id)
+        top = [author_id for author_id, _ in counts.top()] if counts is not None else []
+        names = await self.fetch_author_names(top)
+        popular_ids = {names.get(author_id, str(author_id)): author_id for author_id in top}
+        popular_authors = list(popular_ids)
 
         if len(popular_authors) < 1:
             await ctx.send('There are no popular authors in this server.', ephemeral=True)
+            return
 
         select = AuthorSelect(popular_authors)
         view = AuthoredView(ctx.author)
         view.add_item(select)
 
         await ctx.send(view=view)
-        await view.wait()
+        if await view.wait():
+            return
 
         author_id = popular_ids[select.author]
         author = await self.bot.get_or_fetch(self.bot.fetch_user, author_id)
         await self.hybrid_read.callback(self, ctx, author)
+
+    @commands.hybrid_command(
+        name='search',
+        description='Search every story by name and text!'
+    )
+    @app_commands.describe(
+        query='The words to look for.'
+    )
+    async def hybrid_search(self, ctx: commands.Context, *, query: str):
+        results = await self.search(query)
+        if not results:
+            await ctx.send('No stories matched your search.', ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title=f'Stories matching "{query[:200]}"',
+            color=discord.Color.blurple()
+        )
+        for author_id, name, snippet in results:
+            embed.add_field(
+                name=name[:256],
+                value=f'by <@{author_id}>\n{snippet}'[:1024],
+                inline=False
+            )
+
+        await ctx.send(embed=embed)
+
+    @commands.command(
+        name='migratestories',
+        description='Move stories from the old per author tables into one table.'
+    )
+    @commands.is_owner()
+    async def message_migrate_stories(self, ctx: commands.Context):
+        if self.migration_lock.locked():
+            await ctx.send(f'Already migrating: {self.migration}')
+            return
+        if not self.legacy_authors:
+            await ctx.send('There is nothing to migrate.')
+            return
+
+        await ctx.send(f'Migrating the stories of {len(self.legacy_authors)} authors...')
+        progress = await self.migrate()
+        await ctx.send(f'Finished migrating: {progress}')
+
+    @commands.command(
+        name='recompressstories',
+        description='Compress and deduplicate the text of every story.'
+    )
+    @commands.is_owner()
+    async def message_recompress_stories(self, ctx: commands.Context):
+        if self.migration_lock.locked():
+            await ctx.send('Stories are already being migrated or recompressed.')
+            return
+
+        await ctx.send('Recompressing stories...')
+        before, after = await self.recompress()
+        await ctx.send(
+            f'Story text went from {before / 1024:.1f} KiB to {after / 1024:.1f} KiB, '
+            f'{(before - after) / 1024:.1f} KiB saved.'
+        )
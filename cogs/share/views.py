@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-from typing import Iterable
+import asyncio
+from typing import Awaitable, Callable, Optional
 
 import discord
 
+from utils import AuthoredView
+
 MISSING = discord.utils.MISSING
 
 
+NamePage = Callable[[Optional[str], int], Awaitable[list[str]]]
+
+
 class WritingModal(discord.ui.Modal, title='Write a story'):
     name = discord.ui.TextInput(
         label='Name',
@@ -28,32 +34,118 @@ class WritingModal(discord.ui.Modal, title='Write a story'):
         return name, text
 
 
-class WriteSelect(discord.ui.Select['AuthoredView']):
-    def __init__(self, writes: Iterable[tuple[str, str]]):
-        self.writes = dict(writes)
-
-        options = [
-            discord.SelectOption(label=name) for name, _ in self.writes.items()
-        ]
+class StorySelect(discord.ui.Select['StoryBrowser']):
+    def __init__(self):
         super().__init__(
-            options=options,
             placeholder='Select a story',
             min_values=1,
-            max_values=1
+            max_values=1,
+            row=0
         )
 
-        self.value: tuple[str, str] = MISSING
-
     async def callback(self, interaction: discord.Interaction) -> None:
         await interaction.response.defer()
 
-        self.disabled = True
+        for child in self.view.children:
+            child.disabled = True  # type: ignore
         await interaction.message.edit(view=self.view)
 
-        self.value = (self.values[0], self.writes[self.values[0]])
+        # names can be longer than an option value, so the value is the index on the page
+        self.view.value = self.view.pages[self.view.page][int(self.values[0])]
         self.view.stop()
 
 
+class StoryBrowser(AuthoredView):
+    """Pages through the names of an author's stories.
+
+    Each page is fetched after the last name of the one before and the next
+    one is fetched in the background while a page is shown. Only the name of
+    the selected story is kept, its text is loaded after.
+    """
+
+    page_size: int = 25
+
+    def __init__(self, author: discord.abc.Snowflake | None, fetch_page: NamePage, *, timeout: Optional[float] = 180):
+        super().__init__(author, timeout=timeout)
+        self.fetch_page = fetch_page
+        self.pages: list[list[str]] = []
+        self.page = 0
+        self.prefetch: Optional[asyncio.Task[list[str]]] = None
+        self.value: str = MISSING
+
+        self.select = StorySelect()
+        self.add_item(self.select)
+
+    async def start(self) -> bool:
+        names = await self.fetch_page(None, self.page_size)
+        if not names:
+            return False
+
+        self.pages.append(names)
+        self.show(0)
+        return True
+
+    def show(self, number: int) -> None:
+        self.page = number
+        names = self.pages[number]
+
+        self.select.options = [
+            discord.SelectOption(label=name[:100], value=str(index)) for index, name in enumerate(names)
+        ]
+        self.select.placeholder = f'Select a story (page {number + 1})'
+
+        last_page = number + 1 >= len(self.pages) and len(names) < self.page_size
+        self.previous_button.disabled = number == 0
+        self.next_button.disabled = last_page
+
+        if number + 1 >= len(self.pages) and not last_page and self.prefetch is None:
+            self.prefetch = asyncio.create_task(self.fetch_page(names[-1], self.page_size))
+
+    async def next_page(self) -> list[str]:
+        if self.prefetch is None:
+            return await self.fetch_page(self.pages[-1][-1], self.page_size)
+
+        try:
+            return await self.prefetch
+        finally:
+            self.prefetch = None
+
+    def cancel_prefetch(self) -> None:
+        if self.prefetch is not None:
+            self.prefetch.cancel()
+
+    def stop(self) -> None:
+        self.cancel_prefetch()
+        super().stop()
+
+    async def on_timeout(self) -> None:
+        # a timed out view isn't stopped, the page it was fetching would never be read
+        self.cancel_prefetch()
+        await super().on_timeout()
+
+    @discord.ui.button(label='Previous', row=1)
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await interaction.response.defer()
+        self.show(self.page - 1)
+        await interaction.message.edit(view=self)
+
+    @discord.ui.button(label='Next', row=1)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await interaction.response.defer()
+
+        if self.page + 1 >= len(self.pages):
+            names = await self.next_page()
+            if not names:
+                # the last page was exactly full
+                button.disabled = True
+                await interaction.message.edit(view=self)
+                return
+            self.pages.append(names)
+
+        self.show(self.page + 1)
+        await interaction.message.edit(view=self)
+
+
 class AuthorSelect(discord.ui.Select['AuthoredView']):
     def __init__(self, names: list[str]):
         options = [
@@ -27,7 +27,8 @@ class Text(commands.GroupCog, description='Do cool stuff to some text.'):
     async def hybrid_uwuify(self, ctx: commands.Context, *, text: str):
         view = UwufiyView(ctx.author)
         msg = await ctx.send(view=view)
-        await view.wait()
+        if await view.wait():
+            return
 
         text = owoify.owoify(text, view.select.level)
         await msg.edit(content=text, view=None)
@@ -43,7 +44,8 @@ class Text(commands.GroupCog, description='Do cool stuff to some text.'):
         )
         view = ReplaceView(embed, ctx.author)
         await ctx.send(embed=embed, view=view)
-        await view.wait()
+        if await view.wait():
+            return
 
         text = text.translate(view.replacements)
         await ctx.send(text)
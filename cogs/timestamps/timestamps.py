@@ -47,6 +47,9 @@ class Timestamps(commands.Cog):
         view = InteractionCreator(author=ctx.author)
         await ctx.send(view=view)
         await view.wait()
+        if not view.clicked:
+            await ctx.send('This button expired, run the command again.')
+            return
 
         await self.app_timestamp.callback(self, view.interaction, modal=True)
 
@@ -101,7 +104,8 @@ class Timestamps(commands.Cog):
             await modal.interaction.response.send_message(view=view)
         else:
             await interaction.response.send_message(view=view)
-        await view.wait()
+        if await view.wait():
+            return
 
         timestamp = discord.utils.format_dt(dt, view.style)  # type: ignore
         await interaction.followup.send(timestamp)
@@ -2,6 +2,8 @@ from datetime import datetime
 
 import discord
 
+from utils import ManagedView
+
 
 MISSING = discord.utils.MISSING
 
@@ -153,7 +155,7 @@ class StyleSelect(discord.ui.Select['StyleView']):
         self.view.stop()
 
 
-class StyleView(discord.ui.View):
+class StyleView(ManagedView):
     def __init__(self, dt: datetime):
         super().__init__(timeout=None)
         self.add_item(StyleSelect(dt))
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+from typing import TYPE_CHECKING, Any
+
+import aiofiles
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+if TYPE_CHECKING:
+    from bot import BookShelf
+
+
+def is_submodule(parent: str, child: str) -> bool:
+    return parent == child or child.startswith(f'{parent}.')
+
+
+@dataclasses.dataclass
+class ExtensionTiming:
+    name: str
+    lazy: bool = False
+    import_time: float = 0
+    cog_load_time: float = 0
+    total_time: float = 0
+
+    def __str__(self) -> str:
+        return f'{self.total_time * 1000:.0f}ms (import and setup {self.import_time * 1000:.0f}ms, ' \
+               f'cog_load {self.cog_load_time * 1000:.0f}ms)'
+
+
+class ExtensionManifest:
+    """What each extension registers, so it can be stubbed out without importing it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data: dict[str, dict[str, Any]] = {}
+
+    def __contains__(self, extension: str) -> bool:
+        return extension in self.data
+
+    def __getitem__(self, extension: str) -> dict[str, Any]:
+        return self.data[extension]
+
+    async def from_file(self) -> None:
+        try:
+            async with aiofiles.open(self.path, 'r') as file:
+                raw = await file.read()
+        except FileNotFoundError:
+            return
+
+        try:
+            self.data = json.loads(raw)
+        except json.JSONDecodeError:
+            self.data = {}
+
+    async def to_file(self) -> None:
+        dumped = json.dumps(self.data, indent=4)
+
+        async with aiofiles.open(self.path, 'w') as file:
+            await file.write(dumped)
+
+    def record(self, bot: BookShelf, extension: str) -> None:
+        cogs = [cog for cog in bot.cogs.values() if is_submodule(extension, cog.__module__)]
+
+        prefix_commands: list[list[Any]] = []
+        app_names: set[str] = set()
+        listeners: set[str] = set()
+
+        for cog in cogs:
+            for command in cog.get_commands():
+                prefix_commands.append([command.name, list(command.aliases)])
+
+            group = cog.__cog_app_commands_group__
+            if group is not None:
+                app_names.add(group.name)
+            else:
+                app_names.update(command.name for command in cog.get_app_commands())
+                app_names.update(
+                    command.app_command.name for command in cog.get_commands()
+                    if getattr(command, 'app_command', None) is not None
+                )
+
+            listeners.update(name for name, _ in cog.get_listeners())
+
+        app_payloads = []
+        for name in sorted(app_names):
+            command = bot.tree.get_command(name)
+            if command is not None:
+                app_payloads.append(command.to_dict(bot.tree))
+
+        self.data[extension] = {
+            'commands': prefix_commands,
+            'app_commands': app_payloads,
+            'listeners': sorted(listeners)
+        }
+
+
+class AppCommandStub(app_commands.Command):
+    def __init__(self, extension: str, payload: dict[str, Any]):
+        async def lazy_stub(interaction: discord.Interaction) -> None:
+            # never reached, BookShelfTree loads the real command before dispatching
+            raise app_commands.CommandNotFound(payload['name'], [])
+
+        super().__init__(
+            name=payload['name'],
+            description=payload.get('description') or '...',
+            callback=lazy_stub,
+            extras={'lazy_extension': extension}
+        )
+        self.payload = payload
+
+    def to_dict(self, tree: app_commands.CommandTree) -> dict[str, Any]:
+        # keeps the synced schema identical to the real command's while it isn't loaded
+        return self.payload
+
+
+def make_command_stub(bot: BookShelf, extension: str, name: str, aliases: list[str]) -> commands.Command:
+    async def lazy_stub(ctx: commands.Context, *, _: str = ''):
+        await bot.load_lazy_extension(extension)
+
+        ctx = await bot.get_context(ctx.message)
+        await bot.invoke(ctx)
+
+    return commands.Command(
+        lazy_stub,
+        name=name,
+        aliases=aliases,
+        hidden=True,
+        extras={'lazy_extension': extension}
+    )
+
+
+class BookShelfTree(app_commands.CommandTree):
+    client: BookShelf
+
+    async def interaction_check(self, interaction: discord.Interaction, /) -> bool:
+        data: dict[str, Any] = interaction.data  # type: ignore
+        command = self.get_command(data['name'])
+
+        if isinstance(command, AppCommandStub):
+            await self.client.load_lazy_extension(command.extras['lazy_extension'])
+
+        if interaction.type is discord.InteractionType.application_command:
+            # ended by on_error, or by the bot's completion and error events, see BookShelf.on_command_error
+            measurement = self.client.metrics.track('app', self.qualified_name(data))
+            interaction.extras['measurement'] = measurement.begin()
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError, /) -> None:
+        self.end_measurement(interaction, failed=True)
+        await super().on_error(interaction, error)
+
+    @staticmethod
+    def end_measurement(interaction: discord.Interaction, *, failed: bool) -> None:
+        # several events can end the same invocation, only the first one counts
+        measurement = interaction.extras.pop('measurement', None)
+        if measurement is not None:
+            measurement.failed = failed
+            measurement.end()
+
+    @staticmethod
+    def qualified_name(data: dict[str, Any]) -> str:
+        names = [data['name']]
+        options = data.get('options', [])
+
+        # subcommand groups and subcommands are nested as the only option
+        while options and options[0]['type'] in (
+                discord.AppCommandOptionType.subcommand.value,
+                discord.AppCommandOptionType.subcommand_group.value
+        ):
+            names.append(options[0]['name'])
+            options = options[0].get('options', [])
+
+        return ' '.join(names)
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Mapping, Optional
+
+import aiofiles
+import aiohttp
+from yarl import URL
+
+from utils import SingleFlight
+
+
+def _write(directory: str, path: str, data: bytes) -> int:
+    # a temporary file of its own, concurrent stores of one key would clobber a shared name
+    file = tempfile.NamedTemporaryFile('wb', dir=directory, suffix='.tmp', delete=False)
+    try:
+        with file:
+            file.write(data)
+        os.replace(file.name, path)
+    except BaseException:
+        os.remove(file.name)
+        raise
+    return len(data)
+
+
+def _scan(directory: str) -> OrderedDict[str, int]:
+    # least recently written first, temporary files are left over from a crash
+    files = []
+    for entry in os.scandir(directory):
+        if not entry.is_file():
+            continue
+        if entry.name.endswith('.tmp'):
+            os.remove(entry.path)
+            continue
+        stat = entry.stat()
+        files.append((stat.st_mtime, entry.name, stat.st_size))
+    return OrderedDict((name, size) for _, name, size in sorted(files))
+
+
+def _remove(paths: list[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class CachedResponse:
+    __slots__ = ('status', 'body', 'etag', 'last_modified', 'expires')
+
+    def __init__(
+            self,
+            status: int,
+            body: bytes,
+            *,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None,
+            expires: float = 0
+    ):
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires
+
+    @property
+    def revalidatable(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+
+    def text(self, encoding: str = 'utf-8') -> str:
+        return self.body.decode(encoding)
+
+    def json(self) -> Any:
+        # decoded per call, every caller that hits this entry gets objects it can change
+        return json.loads(self.body)
+
+    def to_header(self) -> dict[str, Any]:
+        return {
+            'status': self.status,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'expires': self.expires
+        }
+
+    @classmethod
+    def from_header(cls, header: dict[str, Any], body: bytes) -> CachedResponse:
+        return cls(
+            header['status'],
+            body,
+            etag=header['etag'],
+            last_modified=header['last_modified'],
+            expires=header['expires']
+        )
+
+
+class HTTPCache:
+    def __init__(
+            self,
+            session: aiohttp.ClientSession,
+            *,
+            max_bytes: int = 16 * 1024 * 1024,
+            directory: Optional[str] = None,
+            max_disk_bytes: int = 256 * 1024 * 1024
+    ):
+        self.session = session
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+
+        self.entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self.total_bytes = 0
+        # file name -> size, least recently used first, read from the directory on first use
+        self.disk_files: Optional[OrderedDict[str, int]] = None
+        self.disk_bytes = 0
+        self.flights: SingleFlight[CachedResponse] = SingleFlight()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+        if not params:
+            return url
+        return str(URL(url).update_query({k: str(v) for k, v in params.items()}))
+
+    # memory tier
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        self._forget(key)
+        if entry.size > self.max_bytes:
+            return
+
+        self.entries[key] = entry
+        self.total_bytes += entry.size
+
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+
+    def _forget(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def _lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    # disk tier
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, self._name(key))
+
+    async def _disk_index(self) -> OrderedDict[str, int]:
+        assert self.directory is not None
+        if self.disk_files is None:
+            files = await asyncio.to_thread(_scan, self.directory)
+            if self.disk_files is None:
+                self.disk_files = files
+                self.disk_bytes = sum(files.values())
+        return self.disk_files
+
+    async def _load(self, key: str) -> Optional[CachedResponse]:
+        if not self.directory:
+            return None
+
+        files = await self._disk_index()
+        name = self._name(key)
+        try:
+            async with aiofiles.open(self._path(key), 'rb') as file:
+                raw = await file.read()
+        except FileNotFoundError:
+            self.disk_bytes -= files.pop(name, 0)
+            return None
+        if name in files:
+            files.move_to_end(name)
+
+        header, _, body = raw.partition(b'\n')
+        try:
+            return CachedResponse.from_header(json.loads(header), body)
+        except (json.JSONDecodeError, KeyError):
+            return None
+
+    async def _store(self, key: str, entry: CachedResponse) -> None:
+        if not self.directory:
+            return
+
+        files = await self._disk_index()
+        data = json.dumps(entry.to_header()).encode() + b'\n' + entry.body
+        size = await asyncio.to_thread(_write, self.directory, self._path(key), data)
+
+        name = self._name(key)
+        self.disk_bytes += size - files.pop(name, 0)
+        files[name] = size
+
+        # the same ceiling as the memory tier, least recently used files go first
+        evicted = []
+        while self.disk_bytes > self.max_disk_bytes and files:
+            evicted_name, evicted_size = files.popitem(last=False)
+            self.disk_bytes -= evicted_size
+            evicted.append(os.path.join(self.directory, evicted_name))
+        if evicted:
+            await asyncio.to_thread(_remove, evicted)
+
+    # requests
+
+    async def get(
+            self,
+            url: str,
+            *,
+            params: Optional[Mapping[str, Any]] = None,
+            ttl: Optional[float] = None
+    ) -> CachedResponse:
+        if not ttl:
+            async with self.session.get(url, params=params) as resp:
+                return CachedResponse(resp.status, await resp.read())
+
+        key = self.make_key(url, params)
+
+        entry = self._lookup(key)
+        if entry is not None and entry.fresh:
+            self.hits += 1
+            return entry
+
+        return await self.flights.run(('GET', key), self._fetch, url, params, ttl, key)
+
+    async def _fetch(self, url: str, params: Optional[Mapping[str, Any]], ttl: float, key: str) -> CachedResponse:
+        entry = self._lookup(key)
+        if entry is None and (entry := await self._load(key)) is not None:
+            self.disk_hits += 1
+            self._remember(key, entry)
+
+            if entry.fresh:
+                return entry
+
+        headers: dict[str, str] = {}
+        # without validators a stale entry can't be confirmed, it's fetched again like a miss
+        if entry is not None and entry.revalidatable:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        async with self.session.get(url, params=params, headers=headers) as resp:
+            if resp.status == 304 and entry is not None and entry.revalidatable:
+                self.revalidated += 1
+                entry.expires = time.time() + ttl
+                await self._store(key, entry)
+                return entry
+
+            self.misses += 1
+            new = CachedResponse(
+                resp.status,
+                await resp.read(),
+                etag=resp.headers.get('ETag'),
+                last_modified=resp.headers.get('Last-Modified'),
+                expires=time.time() + ttl
+            )
+            cacheable = resp.status == 200 and 'no-store' not in resp.headers.get('Cache-Control', '')
+
+        if cacheable:
+            self._remember(key, new)
+            await self._store(key, new)
+        else:
+            self._forget(key)
+
+        return new
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'entries': len(self.entries),
+            'bytes': self.total_bytes,
+            'disk_bytes': self.disk_bytes,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'coalesced': self.flights.coalesced
+        }
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from metrics import Histogram, Metrics
+
+
+_log = logging.getLogger(__name__)
+
+
+LAG_BUCKETS: tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class LoopLagMonitor:
+    """A cheap stand-in for asyncio debug mode.
+
+    A coroutine samples how late the loop wakes it up, and a watchdog thread
+    grabs the loop thread's stack whenever a single callback blocks it for
+    longer than ``threshold``.
+    """
+
+    def __init__(self, *, interval: float = 0.5, threshold: float = 0.1, metrics: Optional[Metrics] = None):
+        self.interval = interval
+        self.threshold = threshold
+        self.metrics = metrics
+
+        self.lag = Histogram(LAG_BUCKETS)
+        self.max_lag = 0.0
+        self.slow_callbacks = 0
+
+        self.last_tick = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+        self.task: Optional[asyncio.Task[None]] = None
+        self.stopped = threading.Event()
+        self.watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.loop_thread_id = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self.stopped.clear()
+
+        self.task = asyncio.create_task(self.sample())
+        self.watchdog = threading.Thread(target=self.watch, name='loop-watchdog', daemon=True)
+        self.watchdog.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+
+    async def sample(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+
+            lag = max(loop.time() - start - self.interval, 0)
+            self.lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self.last_tick = time.monotonic()
+
+            if self.metrics is not None:
+                self.metrics.set_gauge('event_loop_lag_seconds', lag)
+                self.metrics.set_gauge('event_loop_slow_callbacks', self.slow_callbacks)
+
+    def watch(self) -> None:
+        reported = False
+
+        while not self.stopped.wait(self.threshold / 2):
+            stalled = time.monotonic() - self.last_tick - self.interval
+            if stalled < self.threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            # only one report per stall, the stack is the interesting part
+            reported = True
+            self.slow_callbacks += 1
+
+            frame = sys._current_frames().get(self.loop_thread_id)  # type: ignore
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else '<unknown>'
+            _log.warning('Event loop blocked for over %.0fms:\n%s', stalled * 1000, stack)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            'p50': self.lag.percentile(0.5),
+            'p99': self.lag.percentile(0.99),
+            'max': self.max_lag,
+            'slow_callbacks': self.slow_callbacks
+        }
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import collections
+import dataclasses
+import linecache
+import os
+import tracemalloc
+from typing import Any, Iterable, Optional
+
+from utils import deep_sizeof
+
+
+def state_containers(obj: Any) -> dict[str, Any]:
+    # cogs and their mixins list the attributes that hold long lived state in ``state_attributes``
+    names: dict[str, None] = {}
+    for cls in reversed(type(obj).__mro__):
+        for name in vars(cls).get('state_attributes', ()):
+            names[name] = None
+    return {name: getattr(obj, name) for name in names if hasattr(obj, name)}
+
+
+@dataclasses.dataclass
+class ContainerSize:
+    owner: str
+    name: str
+    length: Optional[int]
+    size: int
+
+
+def container_sizes(owners: dict[str, Any], *, exclude: Iterable[Any] = ()) -> list[ContainerSize]:
+    exclude = tuple(exclude)
+    sizes = []
+    for owner_name, owner in owners.items():
+        for name, container in state_containers(owner).items():
+            length = len(container) if hasattr(container, '__len__') else None
+            # the owner itself is excluded so back references don't pull in the whole cog
+            size = deep_sizeof(container, exclude=(*exclude, owner))
+            sizes.append(ContainerSize(owner_name, name, length, size))
+    return sizes
+
+
+@dataclasses.dataclass
+class AllocationSite:
+    location: str
+    size_diff: int
+    count_diff: int
+    size: int
+    line: str
+
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+
+class AllocationTracker:
+    """Keeps the last few tracemalloc snapshots so two of them can be compared.
+
+    Tracing slows down every allocation, it's only on between ``start`` and
+    ``stop``. Snapshots are numbered from 1 and the oldest are dropped after
+    ``max_snapshots``.
+    """
+
+    def __init__(self, *, max_snapshots: int = 5):
+        self.snapshots: collections.OrderedDict[int, tracemalloc.Snapshot] = collections.OrderedDict()
+        self.max_snapshots = max_snapshots
+        self.taken = 0
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self.snapshots.clear()
+
+    def take(self) -> int:
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        self.taken += 1
+        self.snapshots[self.taken] = snapshot
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+        return self.taken
+
+    def diff(self, old: int, new: int, *, limit: int = 10, key: str = 'lineno') -> list[AllocationSite]:
+        stats = self.snapshots[new].compare_to(self.snapshots[old], key)
+
+        sites = []
+        for stat in stats[:limit]:
+            frame = stat.traceback[0]
+            filename = os.path.relpath(frame.filename) if not frame.filename.startswith('<') else frame.filename
+            sites.append(AllocationSite(
+                location=f'{filename}:{frame.lineno}',
+                size_diff=stat.size_diff,
+                count_diff=stat.count_diff,
+                size=stat.size,
+                line=linecache.getline(frame.filename, frame.lineno).strip()
+            ))
+        return sites
+
+    def stats(self) -> dict[str, float]:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'current': current,
+            'peak': peak,
+            'overhead': tracemalloc.get_tracemalloc_memory()
+        }
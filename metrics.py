@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import bisect
+import os
+import random
+import time
+from typing import Iterator, Optional
+
+import aiofiles
+from discord.ext import tasks
+
+
+# seconds, commands that wait on views can legitimately take minutes
+BUCKETS: tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 180, 600
+)
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Prometheus style buckets for exporting, plus a uniform sample of exact values for percentiles."""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS, *, reservoir_size: int = 512):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+        self.reservoir_size = reservoir_size
+        self.reservoir: list[float] = []
+        self._random = random.Random()
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+        # algorithm R, every value seen so far is equally likely to be kept
+        if len(self.reservoir) < self.reservoir_size:
+            self.reservoir.append(value)
+        else:
+            index = self._random.randrange(self.count)
+            if index < self.reservoir_size:
+                self.reservoir[index] = value
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+
+        if self.reservoir:
+            samples = sorted(self.reservoir)
+            position = q * (len(samples) - 1)
+            lower = int(position)
+            upper = min(lower + 1, len(samples) - 1)
+            return samples[lower] + (samples[upper] - samples[lower]) * (position - lower)
+
+        return self.bucket_percentile(q)
+
+    def bucket_percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                # linear interpolation inside the bucket, like prometheus' histogram_quantile
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def cumulative(self) -> Iterator[tuple[str, int]]:
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield repr(float(bound)), total
+        yield '+Inf', self.count
+
+
+class CommandMetrics:
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.latency = Histogram()
+        self.invocations = 0
+        self.errors = 0
+        self.in_flight = 0
+
+    @property
+    def labels(self) -> str:
+        return f'command="{escape_label(self.name)}",type="{self.kind}"'
+
+
+class Measurement:
+    def __init__(self, metrics: Metrics, command: CommandMetrics):
+        self.metrics = metrics
+        self.command = command
+        self.failed = False
+        self.start = 0.0
+
+    def begin(self) -> Measurement:
+        self.start = time.perf_counter()
+        self.command.invocations += 1
+        self.command.in_flight += 1
+        return self
+
+    def end(self) -> None:
+        self.command.in_flight -= 1
+        self.command.latency.observe(time.perf_counter() - self.start)
+        if self.failed:
+            self.command.errors += 1
+
+    def __enter__(self) -> Measurement:
+        return self.begin()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.failed = True
+        self.end()
+
+
+class Metrics:
+    def __init__(self, path: Optional[str] = './metrics.prom', *, interval: float = 30):
+        self.path = path
+        self.commands: dict[tuple[str, str], CommandMetrics] = {}
+        self.gauges: dict[str, float] = {}
+
+        self.exporter.change_interval(seconds=interval)
+
+    def get(self, kind: str, name: str) -> CommandMetrics:
+        key = (kind, name)
+        if key not in self.commands:
+            self.commands[key] = CommandMetrics(kind, name)
+        return self.commands[key]
+
+    def track(self, kind: str, name: str) -> Measurement:
+        return Measurement(self, self.get(kind, name))
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+    def to_prometheus(self) -> str:
+        lines = [
+            '# HELP bookshelf_command_latency_seconds Time from invocation to completion.',
+            '# TYPE bookshelf_command_latency_seconds histogram'
+        ]
+        for command in self.commands.values():
+            for bound, count in command.latency.cumulative():
+                lines.append(f'bookshelf_command_latency_seconds_bucket{{{command.labels},le="{bound}"}} {count}')
+            lines.append(f'bookshelf_command_latency_seconds_sum{{{command.labels}}} {command.latency.sum}')
+            lines.append(f'bookshelf_command_latency_seconds_count{{{command.labels}}} {command.latency.count}')
+
+        for metric, kind, attribute in (
+                ('bookshelf_command_invocations_total', 'counter', 'invocations'),
+                ('bookshelf_command_errors_total', 'counter', 'errors'),
+                ('bookshelf_command_in_flight', 'gauge', 'in_flight')
+        ):
+            lines.append(f'# TYPE {metric} {kind}')
+            for command in self.commands.values():
+                lines.append(f'{metric}{{{command.labels}}} {getattr(command, attribute)}')
+
+        for name, value in self.gauges.items():
+            lines.append(f'# TYPE bookshelf_{name} gauge')
+            lines.append(f'bookshelf_{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    async def write(self) -> None:
+        if not self.path:
+            return
+
+        async with aiofiles.open(f'{self.path}.tmp', 'w') as file:
+            await file.write(self.to_prometheus())
+        os.replace(f'{self.path}.tmp', self.path)
+
+    @tasks.loop(seconds=30)
+    async def exporter(self) -> None:
+        await self.write()
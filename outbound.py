@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+import discord
+
+from metrics import Histogram, Metrics
+
+
+_log = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class OutboundJob:
+    key: Hashable
+    factory: Callable[[], Awaitable[Any]]
+    future: asyncio.Future[Any]
+    enqueued_at: float = dataclasses.field(default_factory=time.perf_counter)
+    attempts: int = 0
+
+
+class Outbound:
+    """Delivers messages for background jobs.
+
+    Jobs with the same key (a channel or a DM) are sent in order, one at a time,
+    while different keys are sent concurrently up to ``concurrency``. discord.py
+    already waits out the rate limit buckets it learns from response headers,
+    this only keeps the sends spread across routes and retries failures.
+    """
+
+    def __init__(
+            self,
+            *,
+            concurrency: int = 16,
+            max_retries: int = 3,
+            base_delay: float = 1,
+            metrics: Optional[Metrics] = None
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.metrics = metrics
+
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.queues: dict[Hashable, collections.deque[OutboundJob]] = {}
+        self.workers: dict[Hashable, asyncio.Task[None]] = {}
+
+        self.delivery_latency = Histogram()
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+
+    @staticmethod
+    def route_key(destination: discord.abc.Messageable) -> Hashable:
+        if isinstance(destination, (discord.User, discord.Member)):
+            return 'dm', destination.id
+        return 'channel', getattr(destination, 'id', None)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def submit(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> asyncio.Future[Any]:
+        job = OutboundJob(key, factory, asyncio.get_running_loop().create_future())
+        self.queues.setdefault(key, collections.deque()).append(job)
+
+        if key not in self.workers:
+            self.workers[key] = asyncio.create_task(self._drain(key))
+        self._update_gauges()
+        return job.future
+
+    def send(self, destination: discord.abc.Messageable, *args: Any, **kwargs: Any) -> asyncio.Future[Any]:
+        return self.submit(self.route_key(destination), lambda: destination.send(*args, **kwargs))
+
+    async def _drain(self, key: Hashable) -> None:
+        queue = self.queues[key]
+        try:
+            while queue:
+                job = queue.popleft()
+                self._update_gauges()
+                try:
+                    await self._deliver(job)
+                except asyncio.CancelledError:
+                    job.future.cancel()
+                    raise
+        finally:
+            for job in queue:
+                job.future.cancel()
+            del self.queues[key]
+            del self.workers[key]
+            self._update_gauges()
+
+    async def _deliver(self, job: OutboundJob) -> None:
+        while True:
+            job.attempts += 1
+            try:
+                async with self.semaphore:
+                    result = await job.factory()
+            except discord.HTTPException as error:
+                retryable = error.status == 429 or error.status >= 500
+                if not retryable or job.attempts > self.max_retries:
+                    self._finish(job, error=error)
+                    return
+
+                self.retries += 1
+                _log.debug('Retrying a send to %s after a %s', job.key, error.status)
+                delay = self.base_delay * 2 ** (job.attempts - 1)
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+            except Exception as error:
+                self._finish(job, error=error)
+                return
+            else:
+                self._finish(job, result=result)
+                return
+
+    def _finish(self, job: OutboundJob, *, result: Any = None, error: Optional[BaseException] = None) -> None:
+        self.delivery_latency.observe(time.perf_counter() - job.enqueued_at)
+
+        if job.future.done():
+            return
+        if error is not None:
+            self.failed += 1
+            job.future.set_exception(error)
+        else:
+            self.sent += 1
+            job.future.set_result(result)
+
+    def _update_gauges(self) -> None:
+        if self.metrics is not None:
+            self.metrics.set_gauge('outbound_queue_depth', self.queue_depth)
+            self.metrics.set_gauge('outbound_active_routes', len(self.workers))
+
+    async def close(self) -> None:
+        workers = list(self.workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            'queued': self.queue_depth,
+            'routes': len(self.workers),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries': self.retries,
+            'p50': self.delivery_latency.percentile(0.5),
+            'p99': self.delivery_latency.percentile(0.99)
+        }
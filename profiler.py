@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses
+import os
+import sys
+import threading
+import time
+import types
+from typing import Any, Optional
+
+
+def frame_name(code: types.CodeType) -> str:
+    # collapsed stacks use ; between frames and a space before the count
+    path = os.path.relpath(code.co_filename) if not code.co_filename.startswith('<') else code.co_filename
+    if path.startswith('..'):
+        path = os.path.join(*code.co_filename.split(os.sep)[-2:])
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'.replace(';', ':')
+
+
+def walk_stack(frame: Optional[types.FrameType]) -> list[str]:
+    stack = []
+    while frame is not None:
+        stack.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def coroutine_stack(coro: Any) -> list[str]:
+    # a suspended task's own frame is only the outermost one, what it's waiting on hangs off cr_await
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None) or getattr(coro, 'ag_frame', None)
+        if frame is None:
+            # a future or something else without a frame is what the chain is waiting on
+            if not isinstance(coro, (types.CoroutineType, types.GeneratorType, types.AsyncGeneratorType)):
+                stack.append(f'<{type(coro).__name__}>')
+            break
+
+        stack.append(frame_name(frame.f_code))
+        coro = (
+            getattr(coro, 'cr_await', None)
+            or getattr(coro, 'gi_yieldfrom', None)
+            or getattr(coro, 'ag_await', None)
+        )
+    return stack
+
+
+@dataclasses.dataclass
+class Profile:
+    duration: float
+    samples: int
+    task_samples: int
+    # root first, joined with ;
+    stacks: collections.Counter[str]
+    task_stacks: collections.Counter[str]
+
+    def functions(self) -> list[tuple[str, int, int]]:
+        own: collections.Counter[str] = collections.Counter()
+        total: collections.Counter[str] = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            # recursion shouldn't count a function twice in one sample
+            for name in set(frames):
+                total[name] += count
+        return [(name, own[name], total[name]) for name in total]
+
+    def top(self, limit: int = 15) -> list[tuple[str, int, int]]:
+        return sorted(self.functions(), key=lambda item: (item[1], item[2]), reverse=True)[:limit]
+
+    def collapsed(self) -> str:
+        lines = [f'{stack} {count}' for stack, count in self.stacks.most_common()]
+        lines += [f'asyncio-tasks;{stack} {count}' for stack, count in self.task_stacks.most_common()]
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Samples where the event loop's thread is from a background thread.
+
+    ``sys._current_frames`` gives the synchronous stack of the loop thread
+    every ``interval``. Coroutines that are suspended don't show up there, so
+    every ``task_interval`` the loop itself records where each pending task
+    is waiting.
+    """
+
+    def __init__(
+            self,
+            loop: asyncio.AbstractEventLoop,
+            thread_id: int,
+            *,
+            interval: float = 0.005,
+            task_interval: float = 0.1
+    ):
+        self.loop = loop
+        self.thread_id = thread_id
+        self.interval = interval
+        self.task_interval = task_interval
+
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self.task_stacks: collections.Counter[str] = collections.Counter()
+        self.samples = 0
+        self.task_samples = 0
+
+    def sample_tasks(self) -> None:
+        # runs on the loop, all_tasks isn't safe to call from another thread
+        self.task_samples += 1
+        for task in asyncio.all_tasks(self.loop):
+            stack = coroutine_stack(task.get_coro())
+            if stack:
+                self.task_stacks[';'.join(stack)] += 1
+
+    def run(self, duration: float) -> Profile:
+        start = time.perf_counter()
+        next_task_sample = start
+
+        while (now := time.perf_counter()) - start < duration:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[';'.join(walk_stack(frame))] += 1
+                self.samples += 1
+            # drop our own reference so the loop thread's frames can be freed
+            del frame
+
+            if now >= next_task_sample:
+                next_task_sample = now + self.task_interval
+                try:
+                    self.loop.call_soon_threadsafe(self.sample_tasks)
+                except RuntimeError:
+                    break
+
+            time.sleep(self.interval)
+
+        return Profile(
+            duration=time.perf_counter() - start,
+            samples=self.samples,
+            task_samples=self.task_samples,
+            stacks=self.stacks,
+            task_stacks=self.task_stacks
+        )
+
+
+async def profile(duration: float, *, interval: float = 0.005, task_interval: float = 0.1) -> Profile:
+    profiler = SamplingProfiler(
+        asyncio.get_running_loop(),
+        threading.get_ident(),
+        interval=interval,
+        task_interval=task_interval
+    )
+    return await asyncio.to_thread(profiler.run, duration)
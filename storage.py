@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+
+import aiosqlite
+import discord
+
+
+T = TypeVar('T')
+
+MISSING = discord.utils.MISSING
+
+WriteJob = Callable[[aiosqlite.Connection], Awaitable[T]]
+
+
+_log = logging.getLogger(__name__)
+
+
+class Database:
+    def __init__(
+            self,
+            path: str,
+            *,
+            readers: int = 4,
+            commit_delay: float = 0.005,
+            max_batch: int = 128,
+            cached_statements: int = 256
+    ):
+        self.path = path
+        self.readers = readers
+        self.commit_delay = commit_delay
+        self.max_batch = max_batch
+        self.cached_statements = cached_statements
+
+        self._writer: aiosqlite.Connection = MISSING
+        self._pool: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._connections: list[aiosqlite.Connection] = []
+        self._jobs: asyncio.Queue[tuple[WriteJob[Any], asyncio.Future[Any]] | None] = asyncio.Queue()
+        self._writer_task: Optional[asyncio.Task[None]] = None
+        self._batch_lock = asyncio.Lock()
+
+        self.commits = 0
+        self.writes = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._writer_task is None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(
+            self.path, isolation_level=None, cached_statements=self.cached_statements
+        )
+        self._connections.append(conn)
+        return conn
+
+    async def open(self) -> None:
+        self._writer = await self._connect()
+        await self._writer.execute('PRAGMA journal_mode=WAL;')
+        await self._writer.execute('PRAGMA synchronous=NORMAL;')
+        await self._writer.execute('PRAGMA busy_timeout=5000;')
+
+        for _ in range(self.readers):
+            reader = await self._connect()
+            await reader.execute('PRAGMA query_only=ON;')
+            await reader.execute('PRAGMA busy_timeout=5000;')
+            self._pool.put_nowait(reader)
+
+        self._writer_task = asyncio.create_task(self._run_writer())
+
+    async def close(self) -> None:
+        if self._writer_task is None:
+            return
+
+        self._jobs.put_nowait(None)
+        await self._writer_task
+        self._writer_task = None
+
+        for conn in self._connections:
+            await conn.close()
+        self._connections.clear()
+        self._pool = asyncio.Queue()
+
+    # reads
+
+    async def fetchall(self, sql: str, parameters: Iterable[Any] = ()) -> list[tuple]:
+        reader = await self._pool.get()
+        try:
+            return list(await reader.execute_fetchall(sql, parameters))
+        finally:
+            self._pool.put_nowait(reader)
+
+    async def fetchone(self, sql: str, parameters: Iterable[Any] = ()) -> Optional[tuple]:
+        reader = await self._pool.get()
+        try:
+            async with reader.execute(sql, parameters) as cursor:
+                return await cursor.fetchone()
+        finally:
+            self._pool.put_nowait(reader)
+
+    # writes
+
+    async def write(self, job: WriteJob[T]) -> T:
+        if self._writer_task is None:
+            raise RuntimeError(f'{self.path} is closed')
+
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._jobs.put_nowait((job, future))
+        return await future
+
+    async def execute(self, sql: str, parameters: Iterable[Any] = ()) -> int:
+        async def job(conn: aiosqlite.Connection) -> int:
+            async with conn.execute(sql, parameters) as cursor:
+                return cursor.rowcount
+
+        return await self.write(job)
+
+    async def executemany(self, sql: str, parameters: Iterable[Iterable[Any]]) -> None:
+        async def job(conn: aiosqlite.Connection) -> None:
+            await conn.executemany(sql, parameters)
+
+        await self.write(job)
+
+    async def checkpoint(self) -> None:
+        # checkpoints can't run inside a transaction, so wait for the current batch instead of queueing
+        async with self._batch_lock:
+            await self._writer.execute('PRAGMA wal_checkpoint(TRUNCATE);')
+
+    async def vacuum(self) -> None:
+        # same as checkpoints, VACUUM can't run inside a transaction
+        async with self._batch_lock:
+            await self._writer.execute('VACUUM;')
+
+    async def _run_writer(self) -> None:
+        while True:
+            item = await self._jobs.get()
+            if item is None:
+                return
+
+            # give concurrent writers a moment to land in the same transaction
+            await asyncio.sleep(self.commit_delay)
+
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._jobs.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            async with self._batch_lock:
+                try:
+                    await self._run_batch(batch)
+                except Exception as exc:
+                    # the writer has to outlive a bad batch or every later write would hang
+                    _log.exception('Write batch on %s failed', self.path)
+                    self._fail(batch, exc)
+            if stop:
+                return
+
+    @staticmethod
+    def _fail(batch: list[tuple[WriteJob[Any], asyncio.Future[Any]]], exc: BaseException) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+    async def _rollback(self) -> None:
+        try:
+            await self._writer.execute('ROLLBACK;')
+        except Exception:
+            # there's no transaction left to roll back when sqlite already ended it
+            _log.debug('Rollback on %s failed', self.path, exc_info=True)
+
+    async def _run_batch(self, batch: list[tuple[WriteJob[Any], asyncio.Future[Any]]]) -> None:
+        conn = self._writer
+        results: list[tuple[asyncio.Future[Any], Any, Optional[BaseException]]] = []
+
+        try:
+            await conn.execute('BEGIN IMMEDIATE;')
+        except Exception as exc:
+            self._fail(batch, exc)
+            return
+
+        try:
+            for job, future in batch:
+                if future.cancelled():
+                    continue
+
+                await conn.execute('SAVEPOINT job;')
+                try:
+                    result = await job(conn)
+                except Exception as exc:
+                    await conn.execute('ROLLBACK TO job;')
+                    await conn.execute('RELEASE job;')
+                    results.append((future, None, exc))
+                else:
+                    await conn.execute('RELEASE job;')
+                    results.append((future, result, None))
+
+            await conn.execute('COMMIT;')
+        except Exception as exc:
+            _log.exception('Group commit on %s failed', self.path)
+            await self._rollback()
+            # nothing in the batch was committed, jobs that failed on their own keep their error
+            errors = {id(future): error for future, _, error in results if error is not None}
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(errors.get(id(future), exc))
+            return
+
+        self.commits += 1
+        self.writes += len(results)
+
+        for future, result, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+class Storage:
+    def __init__(self, *, readers: int = 4, commit_delay: float = 0.005, cached_statements: int = 256):
+        self.readers = readers
+        self.commit_delay = commit_delay
+        self.cached_statements = cached_statements
+        self.databases: dict[str, Database] = {}
+        self._lock = asyncio.Lock()
+
+    async def open(self, path: str) -> Database:
+        path = os.path.normpath(path)
+
+        async with self._lock:
+            database = self.databases.get(path)
+            if database is None or database.closed:
+                database = Database(
+                    path,
+                    readers=self.readers,
+                    commit_delay=self.commit_delay,
+                    cached_statements=self.cached_statements
+                )
+                await database.open()
+                self.databases[path] = database
+
+        return database
+
+    async def checkpoint(self) -> None:
+        for database in self.databases.values():
+            if not database.closed:
+                await database.checkpoint()
+
+    async def close(self) -> None:
+        for database in self.databases.values():
+            await database.close()
+        self.databases.clear()
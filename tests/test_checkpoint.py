@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+import time
+
+import checkpoint
+from checkpoint import Checkpoints
+
+
+def test_close_gives_up_after_the_deadline(tmp_path, monkeypatch):
+    write = checkpoint._write
+
+    def slow_write(*args):
+        time.sleep(0.3)
+        return write(*args)
+
+    monkeypatch.setattr(checkpoint, '_write', slow_write)
+
+    async def main() -> float:
+        checkpoints = Checkpoints()
+        checkpoints.register('state', str(tmp_path / 'state.json'), lambda: {'a': 1})
+        start = time.perf_counter()
+        await checkpoints.close(0.05)
+        # cogs unregister while the bot closes, that mustn't flush again
+        await checkpoints.unregister('state')
+        return time.perf_counter() - start
+
+    assert asyncio.run(main()) < 0.25
+
+
+def test_close_saves_state(tmp_path):
+    async def main() -> None:
+        checkpoints = Checkpoints()
+        checkpoints.register('state', str(tmp_path / 'state.json'), lambda: {'a': 1})
+        await checkpoints.close(5)
+
+    asyncio.run(main())
+    assert json.loads((tmp_path / 'state.json').read_text()) == {'a': 1}
+
+
+def test_clean_checkpoints_arent_snapshotted(tmp_path):
+    snapshots = 0
+
+    def snapshot() -> dict:
+        nonlocal snapshots
+        snapshots += 1
+        return {'a': snapshots}
+
+    async def main() -> Checkpoints:
+        checkpoints = Checkpoints()
+        checkpoints.register('state', str(tmp_path / 'state.json'), snapshot)
+        await checkpoints.flush()
+        await checkpoints.flush()
+        checkpoints.mark_dirty('state')
+        await checkpoints.flush()
+        return checkpoints
+
+    checkpoints = asyncio.run(main())
+    assert snapshots == 2
+    assert checkpoints.stats() == {'state': {'writes': 2, 'skipped': 1}}
+    assert json.loads((tmp_path / 'state.json').read_text()) == {'a': 2}
+
+
+def test_single_process_merges_cluster_copies(tmp_path):
+    path = tmp_path / 'state.json'
+    path.write_text(json.dumps({'a': 1}))
+    (tmp_path / 'state-0.json').write_text(json.dumps({'b': 2}))
+    (tmp_path / 'state-1.json').write_text(json.dumps({'a': 3}))
+    # written before the shared file, so it's already in there
+    (tmp_path / 'state-2.json').write_text(json.dumps({'c': 4}))
+    os.utime(tmp_path / 'state-2.json', (0, 0))
+    os.utime(tmp_path / 'state-0.json', (time.time() + 10,) * 2)
+    os.utime(tmp_path / 'state-1.json', (time.time() + 20,) * 2)
+
+    async def main() -> dict:
+        checkpoints = Checkpoints()
+        data = await checkpoints.load(str(path), {})
+        checkpoints.register('state', str(path), lambda: data)
+        await checkpoints.flush()
+        return data
+
+    assert asyncio.run(main()) == {'a': 3, 'b': 2}
+    assert json.loads(path.read_text()) == {'a': 3, 'b': 2}
+
+
+def test_cluster_loads_the_newest_copy(tmp_path):
+    path = tmp_path / 'state.json'
+    (tmp_path / 'state-0.json').write_text(json.dumps([1]))
+    path.write_text(json.dumps([1, 2]))
+    os.utime(tmp_path / 'state-0.json', (0, 0))
+
+    async def main(cluster: int) -> list:
+        return await Checkpoints(cluster=cluster).load(str(path), [])
+
+    assert asyncio.run(main(0)) == [1, 2]
+
+    (tmp_path / 'state-1.json').write_text(json.dumps([3]))
+    assert asyncio.run(main(1)) == [3]
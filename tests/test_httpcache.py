@@ -0,0 +1,52 @@
+import asyncio
+import os
+
+from httpcache import CachedResponse, HTTPCache
+
+
+def test_json_is_decoded_per_call():
+    response = CachedResponse(200, b'{"a": [1]}')
+    response.json()['a'].append(2)
+    assert response.json() == {'a': [1]}
+
+
+def test_concurrent_stores_of_one_key(tmp_path):
+    async def main() -> CachedResponse:
+        cache = HTTPCache(None, directory=str(tmp_path))  # type: ignore
+        entry = CachedResponse(200, b'{"a": 1}', expires=1e12)
+        await asyncio.gather(*(cache._store('key', entry) for _ in range(20)))
+        return await cache._load('key')  # type: ignore
+
+    assert asyncio.run(main()).json() == {'a': 1}
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_disk_tier_is_capped(tmp_path):
+    async def main() -> HTTPCache:
+        cache = HTTPCache(None, directory=str(tmp_path))  # type: ignore
+        await cache._store('key0', CachedResponse(200, b'x' * 200))
+        # room for four entries
+        cache.max_disk_bytes = cache.disk_bytes * 4 + 10
+        for number in range(1, 10):
+            await cache._store(f'key{number}', CachedResponse(200, b'x' * 200))
+        # reading one keeps it from being the next to go
+        assert await cache._load('key6') is not None
+        await cache._store('key10', CachedResponse(200, b'x' * 200))
+        return cache
+
+    cache = asyncio.run(main())
+    assert cache.disk_bytes <= cache.max_disk_bytes
+    assert sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path)) == cache.disk_bytes
+    assert set(cache.disk_files) == {cache._name(f'key{number}') for number in (6, 8, 9, 10)}
+
+
+def test_disk_index_drops_leftover_temp_files(tmp_path):
+    (tmp_path / 'leftover.tmp').write_bytes(b'half written')
+
+    async def main() -> HTTPCache:
+        cache = HTTPCache(None, directory=str(tmp_path))  # type: ignore
+        await cache._store('key', CachedResponse(200, b'{}'))
+        return cache
+
+    cache = asyncio.run(main())
+    assert os.listdir(tmp_path) == [cache._name('key')]
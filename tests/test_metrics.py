@@ -0,0 +1,45 @@
+import pytest
+
+from metrics import Histogram
+
+
+def test_percentile_empty():
+    assert Histogram().percentile(0.5) == 0.0
+
+
+def test_percentile_is_exact_below_the_reservoir_size():
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.observe(value / 10000)
+
+    assert histogram.percentile(0) == pytest.approx(0.0001)
+    assert histogram.percentile(0.5) == pytest.approx(0.00505)
+    assert histogram.percentile(1) == pytest.approx(0.01)
+
+
+def test_percentile_resolves_below_the_first_bucket():
+    histogram = Histogram()
+    for _ in range(100):
+        histogram.observe(0.0002)
+
+    # every value lands in the first bucket, interpolating it would say 0.25ms
+    assert histogram.percentile(0.5) == pytest.approx(0.0002)
+    assert histogram.bucket_percentile(0.5) == pytest.approx(histogram.buckets[0] / 2)
+
+
+def test_reservoir_stays_bounded():
+    histogram = Histogram(reservoir_size=64)
+    for value in range(10000):
+        histogram.observe(value / 10000)
+
+    assert len(histogram.reservoir) == 64
+    assert histogram.count == 10000
+    assert 0.2 < histogram.percentile(0.5) < 0.8
+
+
+def test_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert list(histogram.cumulative()) == [('0.1', 1), ('1.0', 3), ('+Inf', 4)]
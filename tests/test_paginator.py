@@ -0,0 +1,54 @@
+import asyncio
+
+import discord
+import pytest
+
+from utils import EmbedPaginator
+
+
+class FakeDestination:
+    def __init__(self):
+        self.sent: list[list[discord.Embed]] = []
+
+    async def send(self, *, embeds: list[discord.Embed]) -> list[discord.Embed]:
+        self.sent.append(embeds)
+        return embeds
+
+
+def test_embed_paginator_packs_by_count():
+    async def main() -> FakeDestination:
+        destination = FakeDestination()
+        async with EmbedPaginator(destination, max_embeds=3) as paginator:  # type: ignore
+            for number in range(7):
+                await paginator.add(discord.Embed(title=str(number)))
+        return destination
+
+    destination = asyncio.run(main())
+    assert [len(embeds) for embeds in destination.sent] == [3, 3, 1]
+    assert [embed.title for embeds in destination.sent for embed in embeds] == [str(number) for number in range(7)]
+
+
+def test_embed_paginator_packs_by_size():
+    async def main() -> FakeDestination:
+        destination = FakeDestination()
+        async with EmbedPaginator(destination, max_size=25) as paginator:  # type: ignore
+            for _ in range(3):
+                await paginator.add(discord.Embed(description='x' * 10))
+            # bigger than max_size on its own, still sent alone
+            await paginator.add(discord.Embed(description='x' * 30))
+        return destination
+
+    destination = asyncio.run(main())
+    assert [len(embeds) for embeds in destination.sent] == [2, 1, 1]
+
+
+def test_embed_paginator_doesnt_flush_after_an_error():
+    async def main() -> FakeDestination:
+        destination = FakeDestination()
+        with pytest.raises(RuntimeError):
+            async with EmbedPaginator(destination) as paginator:  # type: ignore
+                await paginator.add(discord.Embed(title='a'))
+                raise RuntimeError
+        return destination
+
+    assert asyncio.run(main()).sent == []
@@ -0,0 +1,34 @@
+import pytest
+
+from cogs.share import bodies
+from cogs.share.database import ShareDatabase
+
+
+@pytest.mark.parametrize('text', ['', 'short', 'a story ' * 200, 'ünïcødé ' * 100])
+def test_pack_round_trips(text):
+    codec, data = bodies.pack(text)
+    assert bodies.unpack(codec, data) == text
+    assert bodies.unpack_body(codec, data) == text
+
+
+def test_pack_leaves_short_texts_raw():
+    assert bodies.pack('short', threshold=512) == (bodies.RAW, b'short')
+
+
+def test_pack_compresses_long_texts():
+    text = 'a story ' * 200
+    codec, data = bodies.pack(text, codec=bodies.ZLIB)
+    assert codec == bodies.ZLIB
+    assert len(data) < len(text.encode())
+
+
+def test_unpack_body_passes_nulls():
+    assert bodies.unpack_body(None, None) is None
+
+
+def test_pack_body_hashes_the_text():
+    database = ShareDatabase()
+    body_hash, codec, data, size = database.pack_body('a story ' * 200)
+    assert body_hash == bodies.digest('a story ' * 200)
+    assert size == len(('a story ' * 200).encode())
+    assert bodies.unpack(codec, data) == 'a story ' * 200
@@ -0,0 +1,43 @@
+import asyncio
+import os
+import types
+
+from checkpoint import Checkpoints
+from cogs.share.database import ShareDatabase
+from storage import Storage
+
+
+class Share(ShareDatabase):
+    def __init__(self):
+        super().__init__()
+        self.bot = types.SimpleNamespace(  # type: ignore
+            storage=Storage(readers=1, commit_delay=0), checkpoints=Checkpoints()
+        )
+
+
+def test_keyset_pagination(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('cogs/share')
+
+    async def main() -> tuple[list[list[str]], str]:
+        share = Share()
+        await share.cog_load()
+        try:
+            author = types.SimpleNamespace(id=1)
+            names = [f'story {number:02}' for number in range(7)]
+            for name in reversed(names):
+                await share.process_write(author, name, 'text of ' + name)  # type: ignore
+            await share.process_write(types.SimpleNamespace(id=2), 'other', 'not mine')  # type: ignore
+
+            pages = []
+            after = None
+            while page := await share.fetch_story_names(1, after, 3):
+                pages.append(page)
+                after = page[-1]
+            return pages, await share.fetch_story(1, 'story 04')  # type: ignore
+        finally:
+            await share.bot.storage.close()
+
+    pages, text = asyncio.run(main())
+    assert pages == [['story 00', 'story 01', 'story 02'], ['story 03', 'story 04', 'story 05'], ['story 06']]
+    assert text == 'text of story 04'
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import types
+
+from checkpoint import Checkpoints
+from cogs.share.database import ShareDatabase, snippet
+from storage import Storage
+
+
+def test_snippet_marks_matches():
+    assert snippet('the dragon flew', ['dragon']) == 'the **dragon** flew'
+
+
+def test_snippet_matches_either_prefix():
+    assert snippet('two dragons and a knight', ['dragon', 'knights']) == 'two **dragons** and a **knight**'
+
+
+def test_snippet_windows_long_texts():
+    text = ' '.join(f'word{number}' for number in range(40)) + ' dragon ' + ' '.join('tail' for _ in range(40))
+    result = snippet(text, ['dragon'], tokens=8)
+    assert result == '...word38 word39 **dragon** tail tail tail tail tail...'
+
+
+def test_snippet_without_a_match_starts_at_the_beginning():
+    assert snippet('a b c d', ['zzz'], tokens=2) == 'a b...'
+
+
+class Share(ShareDatabase):
+    compress_threshold = 16
+
+    def __init__(self):
+        super().__init__()
+        self.bot = types.SimpleNamespace(  # type: ignore
+            storage=Storage(readers=1, commit_delay=0), checkpoints=Checkpoints()
+        )
+
+
+def test_search_finds_compressed_stories(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('cogs/share')
+
+    async def main() -> tuple[list[tuple[int, str, str]], list[tuple[int, str, str]]]:
+        share = Share()
+        await share.cog_load()
+        try:
+            author = types.SimpleNamespace(id=1)
+            await share.process_write(author, 'castle', 'a long story about knights and castles ' * 20)  # type: ignore
+            await share.process_write(author, 'sea', 'the ship sailed on ' * 20)  # type: ignore
+            found = await share.search('knight')
+
+            await share.db.execute('DELETE FROM stories WHERE name = \'castle\';')
+            return found, await share.search('knight')
+        finally:
+            await share.bot.storage.close()
+
+    found, after_delete = asyncio.run(main())
+    assert [(author_id, name) for author_id, name, _ in found] == [(1, 'castle')]
+    assert '**knights**' in found[0][2]
+    assert after_delete == []
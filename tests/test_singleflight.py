@@ -0,0 +1,54 @@
+import asyncio
+
+from utils import SingleFlight
+
+
+def test_single_flight_coalesces():
+    calls = 0
+
+    async def fetch(value: int) -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return value
+
+    async def main() -> tuple[list[int], SingleFlight[int]]:
+        flight: SingleFlight[int] = SingleFlight()
+        results = await asyncio.gather(*(flight.run('key', fetch, 1) for _ in range(5)))
+        return results, flight
+
+    results, flight = asyncio.run(main())
+    assert results == [1] * 5
+    assert calls == 1
+    assert flight.stats() == {'calls': 5, 'coalesced': 4, 'in_flight': 0}
+
+
+def test_single_flight_cancelled_caller_doesnt_cancel_others():
+    async def fetch() -> str:
+        await asyncio.sleep(0.02)
+        return 'done'
+
+    async def main() -> str:
+        flight: SingleFlight[str] = SingleFlight()
+        first = asyncio.create_task(flight.run('key', fetch))
+        second = asyncio.create_task(flight.run('key', fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 'done'
+
+
+def test_single_flight_errors_reach_every_caller():
+    async def fail() -> None:
+        await asyncio.sleep(0)
+        raise ValueError('nope')
+
+    async def main() -> list[BaseException]:
+        flight: SingleFlight[None] = SingleFlight()
+        results = await asyncio.gather(flight.run('key', fail), flight.run('key', fail), return_exceptions=True)
+        assert not flight.in_flight
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+import pytest
+
+from utils import TokenBucket
+
+
+def test_token_bucket_bursts_then_waits():
+    async def main() -> tuple[float, float]:
+        bucket = TokenBucket(rate=50, burst=2)
+        start = time.monotonic()
+        await bucket.acquire()
+        await bucket.acquire()
+        burst = time.monotonic() - start
+        await bucket.acquire()
+        return burst, time.monotonic() - start
+
+    burst, total = asyncio.run(main())
+    assert burst < 0.01
+    assert total >= 0.015
+
+
+def test_token_bucket_never_exceeds_burst():
+    async def main() -> float:
+        bucket = TokenBucket(rate=1000, burst=3)
+        await asyncio.sleep(0.02)
+        bucket._refill()
+        return bucket.tokens
+
+    assert asyncio.run(main()) == 3
+
+
+def test_token_bucket_rejects_what_it_cant_grant():
+    for kwargs in ({'rate': 10, 'burst': 0}, {'rate': 0, 'burst': 1}):
+        with pytest.raises(ValueError):
+            TokenBucket(**kwargs)
+
+    with pytest.raises(ValueError):
+        asyncio.run(asyncio.wait_for(TokenBucket(rate=10, burst=2).acquire(3), timeout=1))
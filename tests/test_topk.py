@@ -0,0 +1,35 @@
+from utils import RunningTop, top_k
+
+
+def test_top_k_highest_first():
+    counts = {'a': 3, 'b': 10, 'c': 1, 'd': 7}
+    assert top_k(counts, 2) == [('b', 10), ('d', 7)]
+    assert top_k(counts, 10) == [('b', 10), ('d', 7), ('a', 3), ('c', 1)]
+
+
+def test_top_k_pairs_and_threshold():
+    pairs = [('a', 1), ('b', 5), ('c', 5), ('d', 2)]
+    # ties keep the order they came in
+    assert top_k(pairs, 2) == [('b', 5), ('c', 5)]
+    assert top_k(pairs, 10, greater_than=1) == [('b', 5), ('c', 5), ('d', 2)]
+    assert top_k({}, 3) == []
+
+
+def test_running_top_matches_top_k():
+    running = RunningTop(3, {'a': 5, 'b': 1})
+    counts = {'a': 5, 'b': 1}
+
+    for key in 'cbbdcceeeeb':
+        running.increment(key)
+        counts[key] = counts.get(key, 0) + 1
+        assert [count for _, count in running.top()] == [count for _, count in top_k(counts, 3)]
+
+    assert running.top()[0] == ('a', 5)
+    assert len(running) == len(counts)
+
+
+def test_running_top_increment_returns_count():
+    running: RunningTop[str] = RunningTop(1)
+    assert running.increment('a') == 1
+    assert running.increment('b', 3) == 3
+    assert running.top() == [('b', 3)]
@@ -1,24 +1,104 @@
 from __future__ import annotations
 
-from math import ceil
-from typing import Any, Iterable, Generator, Optional, overload, Sequence, TypeVar
+import asyncio
+import collections
+import dataclasses
+import heapq
+import operator
+import sys
+import time
+import types
+from typing import (
+    TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Awaitable, Callable, ClassVar, Generic, Hashable, Iterable,
+    Mapping, Optional, Sized, TypeVar
+)
 
 import discord
-import numpy
+
+if TYPE_CHECKING:
+    from metrics import Metrics
 
 
 T = TypeVar('T')
+R = TypeVar('R')
 
 
 MISSING = discord.utils.MISSING
 
 
-class AuthoredView(discord.ui.View):
+class ManagedView(discord.ui.View):
+    """A view that counts towards a ceiling of live views.
+
+    Views without a timeout stay in the view store until they're stopped, so
+    when there are more than ``max_live`` the least recently used one is
+    timed out early. A view only counts once it has been sent, and whoever
+    waits on one has to handle it finishing like it timed out.
+    """
+
+    max_live: ClassVar[int] = 1000
+    metrics: ClassVar[Optional[Metrics]] = None
+    live: ClassVar[collections.OrderedDict[str, ManagedView]] = collections.OrderedDict()
+    evicted: ClassVar[int] = 0
+    # on_timeout tasks of evicted views, the loop only keeps weak references
+    _timeout_tasks: ClassVar[set[asyncio.Task[None]]] = set()
+
+    expired: bool = False
+
+    def _start_listening_from_store(self, store: Any) -> None:
+        # called by discord.py whenever the view is stored for a sent or edited message
+        super()._start_listening_from_store(store)  # type: ignore
+        self.live[self.id] = self
+        self.live.move_to_end(self.id)
+
+        while len(self.live) > self.max_live:
+            _, view = self.live.popitem(last=False)
+            view.evict()
+        self.update_gauges()
+
+    @classmethod
+    def update_gauges(cls) -> None:
+        if cls.metrics is not None:
+            cls.metrics.set_gauge('live_views', len(cls.live))
+            cls.metrics.set_gauge('evicted_views', cls.evicted)
+
+    def evict(self) -> None:
+        ManagedView.evicted += 1
+        self.expired = True
+        self.stop()
+        task = asyncio.create_task(self.on_timeout())
+        self._timeout_tasks.add(task)
+        task.add_done_callback(self._timeout_tasks.discard)
+
+    def forget(self) -> None:
+        if self.live.pop(self.id, None) is not None:
+            self.update_gauges()
+
+    def stop(self) -> None:
+        self.forget()
+        super().stop()
+
+    def _dispatch_timeout(self) -> None:
+        self.forget()
+        super()._dispatch_timeout()  # type: ignore
+
+    async def wait(self) -> bool:
+        # an evicted view reports that it timed out
+        timed_out = await super().wait()
+        return timed_out or self.expired
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if self.id in self.live:
+            self.live.move_to_end(self.id)
+        return True
+
+
+class AuthoredView(ManagedView):
     def __init__(self, author: discord.abc.Snowflake | None, *, timeout: Optional[float] = 180):
         self.author = author
         super().__init__(timeout=timeout)
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        await super().interaction_check(interaction)
         if not self.author:
             return True
         if interaction.user == self.author:
@@ -32,6 +112,11 @@ class InteractionCreator(AuthoredView):
         super().__init__(*args, **kwargs)
         self.interaction: discord.Interaction = MISSING
 
+    @property
+    def clicked(self) -> bool:
+        # false after a timeout or an eviction
+        return self.interaction is not MISSING
+
     @discord.ui.button(label='Click to start!', style=discord.ButtonStyle.green)
     async def creator(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
         self.interaction = interaction
@@ -58,11 +143,125 @@ class VirtualContext:
         pass
 
 
-async def split_embeds(embeds: list[discord.Embed], channel: discord.abc.Messageable) -> None:
-    embeds_list = [list(array) for array in numpy.array_split(embeds, ceil(len(embeds) / 10))]  # type: ignore
+class EmbedPaginator:
+    """Packs embeds into as few messages as Discord allows, sending each one as soon as it's full."""
+
+    def __init__(
+            self,
+            destination: discord.abc.Messageable,
+            *,
+            max_embeds: int = 10,
+            max_size: int = 6000
+    ):
+        self.destination = destination
+        self.max_embeds = max_embeds
+        self.max_size = max_size
+
+        self.pending: list[discord.Embed] = []
+        self.size = 0
+        self.messages: list[discord.Message] = []
+
+    async def add(self, embed: discord.Embed) -> None:
+        size = len(embed)
+        if self.pending and self.size + size > self.max_size:
+            await self.flush()
+
+        self.pending.append(embed)
+        self.size += size
+
+        if len(self.pending) >= self.max_embeds:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+
+        embeds = self.pending
+        self.pending = []
+        self.size = 0
+        self.messages.append(await self.destination.send(embeds=embeds))
+
+    async def __aenter__(self) -> EmbedPaginator:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.flush()
 
-    for embeds in embeds_list:
-        await channel.send(embeds=embeds)
+
+async def split_embeds(embeds: Iterable[discord.Embed], channel: discord.abc.Messageable) -> None:
+    async with EmbedPaginator(channel) as paginator:
+        for embed in embeds:
+            await paginator.add(embed)
+
+
+class SingleFlight(Generic[T]):
+    def __init__(self):
+        self.in_flight: dict[Hashable, asyncio.Task[T]] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        self.calls += 1
+
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+
+        # shielded so one caller giving up doesn't cancel the request for everyone else
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task[T]) -> None:
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved in case every caller was cancelled
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'in_flight': len(self.in_flight)
+        }
+
+
+# shared by everything, counting them would only add noise
+_UNSIZED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj: Any, *, exclude: Iterable[Any] = ()) -> int:
+    seen = {id(excluded) for excluded in exclude}
+    stack = [obj]
+    size = 0
+
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _UNSIZED):
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, collections.deque)):
+            stack.extend(current)
+        elif isinstance(current, (str, bytes, bytearray, int, float)):
+            continue
+
+        if hasattr(current, '__dict__'):
+            stack.append(current.__dict__)
+        for cls in type(current).__mro__:
+            slots = getattr(cls, '__slots__', ())
+            for slot in (slots,) if isinstance(slots, str) else slots:
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+
+    return size
 
 
 class AlmostInteractionContext:
@@ -75,33 +274,186 @@ KT = TypeVar('KT')
 VT = TypeVar('VT')
 
 
-@overload
-def get_max(population: dict[KT, VT], greater_than: None = None) -> KT:
-    ...
+def top_k(
+        population: Mapping[KT, VT] | Iterable[tuple[KT, VT]],
+        k: int,
+        *,
+        greater_than: Optional[VT] = None
+) -> list[tuple[KT, VT]]:
+    """The ``k`` highest ``(key, value)`` pairs, highest first.
 
+    Only values above ``greater_than`` count when it's given. Ties keep the
+    order they came in, ``heapq.nlargest`` is stable.
+    """
 
-@overload
-def get_max(population: dict[KT, VT], greater_than: Any) -> Optional[KT]:
-    ...
+    pairs: Iterable[tuple[KT, VT]] = population.items() if isinstance(population, Mapping) else population
+    if greater_than is not None:
+        pairs = (pair for pair in pairs if pair[1] > greater_than)  # type: ignore
+    return heapq.nlargest(k, pairs, key=operator.itemgetter(1))
 
 
-def get_max(population: dict[KT, VT], greater_than: Optional[Any] = None) -> Optional[KT]:
-    highest = max(population, key=population.get)  # type: ignore
-    if not greater_than or population[highest] > greater_than:
-        return highest
+class RunningTop(Generic[KT]):
+    """Counts keys and keeps the ``k`` highest up to date as they're incremented.
 
+    Counts only go up, so a key can only get into the top by passing the
+    lowest one in it and ``top`` never has to look at the rest.
+    """
 
-async def async_yielder(iterable: Sequence[T], *, count: int, delay: float) -> Generator[Iterable[T], Any, Any]:
-    temp: list[T] = []
-    counter = 0
-    for item in iterable:
-        counter += 1
-        temp.append(item)
-
-        if counter >= count:
-            yield temp
-            temp.clear()
-            counter = 0
-
-    if temp:
-        yield temp
+    def __init__(self, k: int, counts: Optional[Mapping[KT, int]] = None):
+        self.k = k
+        self.counts: dict[KT, int] = dict(counts or {})
+        self._top: list[KT] = [key for key, _ in top_k(self.counts, k)]
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def increment(self, key: KT, amount: int = 1) -> int:
+        count = self.counts.get(key, 0) + amount
+        self.counts[key] = count
+
+        if key not in self._top:
+            if len(self._top) < self.k:
+                self._top.append(key)
+            elif count > self.counts[self._top[-1]]:
+                self._top[-1] = key
+            else:
+                return count
+
+        self._top.sort(key=self.counts.__getitem__, reverse=True)
+        return count
+
+    def top(self) -> list[tuple[KT, int]]:
+        return [(key, self.counts[key]) for key in self._top]
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions a second on average, with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError(f'rate must be positive, not {rate}')
+        if burst < 1:
+            raise ValueError(f'burst must be at least 1, not {burst}')
+
+        self.rate = rate
+        self.burst = burst
+        self.tokens: float = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.tokens + (now - self.updated) * self.rate, self.burst)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1) -> None:
+        if tokens > self.burst:
+            # the bucket never holds more than burst, so this would wait forever
+            raise ValueError(f'cannot acquire {tokens} tokens from a bucket of {self.burst}')
+
+        # the lock keeps waiters in order, otherwise a late caller could take the tokens an earlier one slept for
+        async with self.lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+@dataclasses.dataclass
+class BatchProgress:
+    total: Optional[int] = None
+    started: int = 0
+    done: int = 0
+    failed: int = 0
+    started_at: float = dataclasses.field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rate(self) -> float:
+        return self.done / self.elapsed if self.elapsed else 0
+
+    def __str__(self) -> str:
+        total = '?' if self.total is None else self.total
+        return f'{self.done}/{total} done, {self.failed} failed, {self.rate:.1f}/s'
+
+
+_DONE = object()
+
+
+async def _as_async_iterable(items: Iterable[T] | AsyncIterable[T]) -> AsyncIterator[T]:
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def rate_limited(
+        func: Callable[[T], Awaitable[R]],
+        items: Iterable[T] | AsyncIterable[T],
+        *,
+        rate: float,
+        burst: int = 1,
+        concurrency: Optional[int] = None,
+        progress: Optional[Callable[[BatchProgress], Any]] = None
+) -> AsyncIterator[tuple[T, R | Exception]]:
+    """Calls ``func`` on each item, starting at most ``rate`` calls a second.
+
+    Results are yielded as ``(item, result)`` in the order the calls finish, an
+    exception raised by a call is yielded in place of its result.
+    ``concurrency`` bounds how many calls run at once and ``progress`` is called
+    after each one finishes.
+    """
+
+    bucket = TokenBucket(rate, burst)
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+    state = BatchProgress(total=len(items) if isinstance(items, Sized) else None)
+    results: asyncio.Queue[Any] = asyncio.Queue()
+    tasks: set[asyncio.Task[None]] = set()
+
+    async def call(item: T) -> None:
+        try:
+            result: R | Exception = await func(item)
+        except Exception as error:
+            state.failed += 1
+            result = error
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+        state.done += 1
+        if progress is not None:
+            progress(state)
+        results.put_nowait((item, result))
+
+    async def produce() -> None:
+        try:
+            async for item in _as_async_iterable(items):
+                if semaphore is not None:
+                    await semaphore.acquire()
+                await bucket.acquire()
+
+                state.started += 1
+                task = asyncio.create_task(call(item))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            await asyncio.gather(*tasks)
+        finally:
+            results.put_nowait(_DONE)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (entry := await results.get()) is not _DONE:
+            yield entry
+        # surfaces an error from iterating ``items``
+        await producer
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()